@@ -173,6 +173,10 @@ class DataFrame(ABC):
     def drop(self, name: str):
         raise NotImplementedError()
 
+    @abstractmethod
+    def drop_many(self, names):
+        raise NotImplementedError()
+
     @abstractmethod
     def create_group(self, name):
         raise NotImplementedError()
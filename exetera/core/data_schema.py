@@ -75,6 +75,16 @@ from exetera.core import readerwriter as rw
 # }
 
 
+def _categorical_importer(stv, oor=None):
+    if oor is None:
+        return lambda ds, g, n, ts: rw.CategoricalWriter(ds, g, n, stv, ts)
+    key_size = rw.categories_key_size(stv)
+    key_arrays = rw.categories_to_arrays(stv)
+    return lambda ds, g, n, ts: rw.LeakyCategoricalImporter(ds, g, n, stv, oor, ts,
+                                                            key_size=key_size,
+                                                            key_arrays=key_arrays)
+
+
 new_field_importers = {
     'string': lambda:
         lambda ds, g, n, ts: rw.IndexedStringWriter(ds, g, n, ts),
@@ -86,9 +96,7 @@ new_field_importers = {
         lambda ds, g, n, ts: rw.OptionalDateImporter(ds, g, n, is_day, optional, ts),
     'numeric': lambda typestr, parser, default, vmode, is_flag, flag_suffix:
         lambda ds, g, n, ts: rw.NumericImporter(ds, g, n, typestr, parser, default, vmode, is_flag, flag_suffix, ts),
-    'categorical': lambda stv, oor=None:
-        lambda ds, g, n, ts: rw.CategoricalWriter(ds, g, n, stv, ts) if oor is None else
-        rw.LeakyCategoricalImporter(ds, g, n, stv, oor, ts)
+    'categorical': _categorical_importer
 }
 
 class FieldDesc:
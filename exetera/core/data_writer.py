@@ -11,6 +11,18 @@
 
 from threading import Thread
 
+import numpy as np
+
+
+# datasets are chunked so that each chunk is roughly this many bytes, whatever their dtype
+CHUNK_BYTES = 1 << 20
+MIN_CHUNK_LENGTH = 1 << 10
+
+
+def chunk_length(dtype):
+    return max(CHUNK_BYTES // max(np.dtype(dtype).itemsize, 1), MIN_CHUNK_LENGTH)
+
+
 class DataWriter:
 
     @staticmethod
@@ -52,20 +64,22 @@ class DataWriter:
     @staticmethod
     def _write_first(group, name, field, count, dtype=None):
         if dtype is not None:
+            chunks = (chunk_length(dtype),)
             if count == len(field):
                 ds = group.create_dataset(
-                    name, (count,), maxshape=(None,), chunks=(1 << 20,), dtype=dtype)
+                    name, (count,), maxshape=(None,), chunks=chunks, dtype=dtype)
                 ds[:] = field
             else:
                 ds = group.create_dataset(
-                    name, (count,), maxshape=(None,), chunks=(1 << 20,), dtype=dtype)
+                    name, (count,), maxshape=(None,), chunks=chunks, dtype=dtype)
                 ds[:] = field[:count]
         else:
+            chunks = (chunk_length(np.asarray(field).dtype),)
             if count == len(field):
-                group.create_dataset(name, (count,), maxshape=(None,), chunks=(1 << 20,),
+                group.create_dataset(name, (count,), maxshape=(None,), chunks=chunks,
                                      data=field)
             else:
-                group.create_dataset(name, (count,), maxshape=(None,), chunks=(1 << 20,),
+                group.create_dataset(name, (count,), maxshape=(None,), chunks=chunks,
                                      data=field[:count])
 
     @staticmethod
@@ -77,9 +91,16 @@ class DataWriter:
 
     @staticmethod
     def _write_additional(group, name, field, count):
+        if count == 0:
+            return
         gv = group[name]
-        gv.resize((gv.size + count,))
-        if count == len(field):
+        start = gv.size
+        gv.resize((start + count,))
+        if count == len(field) and isinstance(field, np.ndarray) and\
+                field.dtype == gv.dtype and field.flags.c_contiguous:
+            # the array already has the dataset's layout, so hdf5 can write it without conversion
+            gv.write_direct(field, dest_sel=np.s_[start:start + count])
+        elif count == len(field):
             gv[-count:] = field
         else:
             gv[-count:] = field[:count]
@@ -10,8 +10,9 @@
 # limitations under the License.
 from typing import Mapping, Optional, Sequence, Tuple, Union
 from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import os
 import numpy as np
-import pandas as pd
 
 from exetera.core.abstract_types import Dataset, DataFrame
 from exetera.core import fields as fld
@@ -56,11 +57,15 @@ class HDF5DataFrame(DataFrame):
 
         self.name = name
         self._columns = OrderedDict()
+        self._column_ids = dict()
         self._dataset = dataset
         self._h5group = h5group
 
-        for subg in h5group.keys():
-            self._columns[subg] = dataset.session.get(h5group[subg])
+        # iterate over the items of the group so that each child is only looked up once
+        for name, subg in h5group.items():
+            field = dataset.session.get(subg)
+            self._columns[name] = field
+            self._column_ids[id(field)] = name
 
     @property
     def columns(self):
@@ -91,20 +96,36 @@ class HDF5DataFrame(DataFrame):
 
         :param field: field to add to this dataframe, copy the underlying dataset
         """
-        dname = field.name[field.name.index('/', 1)+1:]
-        nfield = field.create_like(self, dname)
-        if field.indexed:
-            nfield.indices.write(field.indices[:])
-            nfield.values.write(field.values[:])
-        else:
-            nfield.data.write(field.data[:])
-        self._columns[dname] = nfield
+        _copy_field(field, self, field.name)
 
     def drop(self,
              name: str):
+        self._column_ids.pop(id(self._columns[name]), None)
         del self._columns[name]
         del self._h5group[name]
 
+    def drop_many(self,
+                  names: Sequence[str]):
+        """
+        Drop several fields from this dataframe. All of the names are checked before any field
+        is dropped, so either every field is dropped or, if a name is missing or repeated, none
+        are.
+
+        :param names: the names of the fields to drop
+        """
+        names = list(names)
+        for name in names:
+            if name not in self._columns:
+                raise ValueError("There is no field named '{}' in this dataframe".format(name))
+        if len(set(names)) != len(names):
+            raise ValueError("'names' must not contain duplicates")
+
+        gid = self._h5group.id
+        for name in names:
+            self._column_ids.pop(id(self._columns[name]), None)
+            del self._columns[name]
+            gid.unlink(name.encode())
+
     def create_group(self,
                      name: str):
         """
@@ -131,6 +152,7 @@ class HDF5DataFrame(DataFrame):
         field = fld.IndexedStringField(self._dataset.session, self._h5group[name], self,
                                        write_enabled=True)
         self._columns[name] = field
+        self._column_ids[id(field)] = name
         return self._columns[name]
 
     def create_fixed_string(self,
@@ -148,6 +170,7 @@ class HDF5DataFrame(DataFrame):
         field = fld.FixedStringField(self._dataset.session, self._h5group[name], self,
                                      write_enabled=True)
         self._columns[name] = field
+        self._column_ids[id(field)] = name
         return self._columns[name]
 
     def create_numeric(self,
@@ -165,6 +188,7 @@ class HDF5DataFrame(DataFrame):
         field = fld.NumericField(self._dataset.session, self._h5group[name], self,
                                  write_enabled=True)
         self._columns[name] = field
+        self._column_ids[id(field)] = name
         return self._columns[name]
 
     def create_categorical(self,
@@ -183,6 +207,7 @@ class HDF5DataFrame(DataFrame):
         field = fld.CategoricalField(self._dataset.session, self._h5group[name], self,
                                      write_enabled=True)
         self._columns[name] = field
+        self._column_ids[id(field)] = name
         return self._columns[name]
 
     def create_timestamp(self,
@@ -199,6 +224,7 @@ class HDF5DataFrame(DataFrame):
         field = fld.TimestampField(self._dataset.session, self._h5group[name], self,
                                    write_enabled=True)
         self._columns[name] = field
+        self._column_ids[id(field)] = name
         return self._columns[name]
 
     def __contains__(self, name):
@@ -209,10 +235,15 @@ class HDF5DataFrame(DataFrame):
         :return: A boolean value indicating whether this DataFrame contains a Field with the
             name in question
         """
+        # only str names are ever stored, so the type is only checked when the lookup misses
+        try:
+            if name in self._columns:
+                return True
+        except TypeError:
+            pass
         if not isinstance(name, str):
             raise TypeError("The name must be a str object.")
-        else:
-            return name in self._columns
+        return False
 
     def contains_field(self, field):
         """
@@ -223,10 +254,7 @@ class HDF5DataFrame(DataFrame):
         if not isinstance(field, fld.Field):
             raise TypeError("The field must be a Field object")
         else:
-            for v in self._columns.values():
-                if id(field) == id(v):
-                    return True
-            return False
+            return id(field) in self._column_ids
 
     def __getitem__(self, name):
         """
@@ -234,12 +262,15 @@ class HDF5DataFrame(DataFrame):
 
         :param name: The name of field to get.
         """
+        try:
+            field = self._columns.get(name)
+        except TypeError:
+            field = None
+        if field is not None:
+            return field
         if not isinstance(name, str):
             raise TypeError("The name must be of type str but is of type '{}'".format(str))
-        elif not self.__contains__(name):
-            raise ValueError("There is no field named '{}' in this dataframe".format(name))
-        else:
-            return self._columns[name]
+        raise ValueError("There is no field named '{}' in this dataframe".format(name))
 
     def get_field(self, name):
         """
@@ -254,19 +285,14 @@ class HDF5DataFrame(DataFrame):
             raise TypeError("The name must be of type str but is of type '{}'".format(str))
         if not isinstance(field, fld.Field):
             raise TypeError("The field must be a Field object.")
-        nfield = field.create_like(self, name)
-        if field.indexed:
-            nfield.indices.write(field.indices[:])
-            nfield.values.write(field.values[:])
-        else:
-            nfield.data.write(field.data[:])
-        self._columns[name] = nfield
+        _copy_field(field, self, name)
 
     def __delitem__(self, name):
         if not self.__contains__(name=name):
             raise ValueError("There is no field named '{}' in this dataframe".format(name))
         else:
             del self._h5group[name]
+            self._column_ids.pop(id(self._columns[name]), None)
             del self._columns[name]
 
     def delete_field(self, field):
@@ -393,6 +419,7 @@ class HDF5DataFrame(DataFrame):
                 final_columns[k] = f
 
         self._columns = final_columns
+        self._column_ids = {id(f): k for k, f in final_columns.items()}
 
 
     def apply_filter(self, filter_to_apply, ddf=None):
@@ -403,16 +430,25 @@ class HDF5DataFrame(DataFrame):
         :param ddf: optional- the destination data frame
         :returns: a dataframe contains all the fields filterd, self if ddf is not set
         """
+        filter_to_apply_ = val.array_from_field_or_lower('filter_to_apply', filter_to_apply)
+        if filter_to_apply_.dtype == bool:
+            # convert the filter to indices once, rather than once for each field it is applied to
+            for name, field in self._columns.items():
+                if len(field) != len(filter_to_apply_):
+                    msg = "'filter_to_apply' is of length {} but field '{}' is of length {}"
+                    raise ValueError(msg.format(len(filter_to_apply_), name, len(field)))
+            return self.apply_index(np.flatnonzero(filter_to_apply_), ddf)
+
         if ddf is not None:
             if not isinstance(ddf, DataFrame):
                 raise TypeError("The destination object must be an instance of DataFrame.")
             for name, field in self._columns.items():
                 newfld = field.create_like(ddf, name)
-                field.apply_filter(filter_to_apply, target=newfld)
+                field.apply_filter(filter_to_apply_, target=newfld)
             return ddf
         else:
             for field in self._columns.values():
-                field.apply_filter(filter_to_apply, in_place=True)
+                field.apply_filter(filter_to_apply_, in_place=True)
             return self
 
     def apply_index(self, index_to_apply, ddf=None):
@@ -423,19 +459,48 @@ class HDF5DataFrame(DataFrame):
         :param ddf: optional- the destination data frame
         :returns: a dataframe contains all the fields re-indexed, self if ddf is not set
         """
+        index_to_apply_ = val.array_from_field_or_lower('index_to_apply', index_to_apply)
         if ddf is not None:
             if not isinstance(ddf, DataFrame):
                 raise TypeError("The destination object must be an instance of DataFrame.")
             for name, field in self._columns.items():
                 newfld = field.create_like(ddf, name)
-                field.apply_index(index_to_apply, target=newfld)
+                field.apply_index(index_to_apply_, target=newfld)
             return ddf
         else:
             for field in self._columns.values():
-                field.apply_index(index_to_apply, in_place=True)
+                field.apply_index(index_to_apply_, in_place=True)
             return self
 
 
+def _copy_field(field: fld.Field, dataframe: DataFrame, name: str):
+    """
+    Copy a field into a dataframe without materialising it in memory. HDF5 fields are copied by
+    HDF5 itself, from group to group; other fields are streamed to the destination a chunk at a
+    time.
+    """
+    if isinstance(field, fld.HDF5Field):
+        if name in dataframe.h5group:
+            msg = "Field '{}' already exists in group '{}'"
+            raise ValueError(msg.format(name, dataframe.h5group))
+        dataframe.h5group.copy(field._field, dataframe.h5group, name=name)
+        dfield = type(field)(dataframe.dataset.session, dataframe.h5group[name], dataframe,
+                             write_enabled=True)
+    else:
+        dfield = field.create_like(dataframe, name)
+        if field.indexed:
+            arrays = ((field.indices, dfield.indices), (field.values, dfield.values))
+        else:
+            arrays = ((field.data, dfield.data),)
+        for src, dest in arrays:
+            for start, stop in ops.chunks(len(src)):
+                dest.write_part(src[start:stop])
+            dest.complete()
+    dataframe._columns[name] = dfield
+    dataframe._column_ids[id(dfield)] = name
+    return dfield
+
+
 def copy(field: fld.Field, dataframe: DataFrame, name: str):
     """
     Copy a field to another dataframe as well as underlying dataset.
@@ -444,14 +509,7 @@ def copy(field: fld.Field, dataframe: DataFrame, name: str):
     :param dataframe: The destination dataframe to copy to.
     :param name: The name of field under destination dataframe.
     """
-    dfield = field.create_like(dataframe, name)
-    if field.indexed:
-        dfield.indices.write(field.indices[:])
-        dfield.values.write(field.values[:])
-    else:
-        dfield.data.write(field.data[:])
-    dataframe.columns[name] = dfield
-    return dataframe[name]
+    return _copy_field(field, dataframe, name)
 
 
 def move(field: fld.Field, dest_df: DataFrame, name: str):
@@ -466,6 +524,23 @@ def move(field: fld.Field, dest_df: DataFrame, name: str):
     if field.dataframe == dest_df:
         dest_df.rename(field.name, name)
         return field
+    elif field.dataframe.h5group.file == dest_df.h5group.file:
+        # both dataframes are in the same file, so the field's group can simply be relinked
+        # under the destination dataframe rather than copying its data
+        if name in dest_df.h5group:
+            msg = "Field '{}' already exists in group '{}'"
+            raise ValueError(msg.format(name, dest_df.h5group))
+        src_df = field.dataframe
+        src_name = field.name
+        dest_df.h5group.file.move(field._field.name, '{}/{}'.format(dest_df.h5group.name, name))
+        src_df._column_ids.pop(id(src_df._columns[src_name]), None)
+        del src_df._columns[src_name]
+        field._valid_reference = False
+        dfield = type(field)(dest_df.dataset.session, dest_df.h5group[name], dest_df,
+                             write_enabled=True)
+        dest_df._columns[name] = dfield
+        dest_df._column_ids[id(dfield)] = name
+        return dfield
     else:
         copy(field, dest_df, name)
         field.dataframe.drop(field.name)
@@ -473,6 +548,87 @@ def move(field: fld.Field, dest_df: DataFrame, name: str):
         return dest_df[name]
 
 
+def _get_merge_key_data(left_on: fld.Field, right_on: fld.Field):
+    """
+    Get the data for a pair of merge keys. Categorical keys are joined on their integer values;
+    if the two keys map values to category names differently, the right values are remapped to
+    the left's values so that only values with the same category name match.
+    """
+    categorical_types = (fld.CategoricalField, fld.CategoricalMemField)
+    l_data = left_on.data[:]
+    r_data = right_on.data[:]
+    if not (isinstance(left_on, categorical_types) and isinstance(right_on, categorical_types)):
+        return l_data, r_data
+
+    l_keys = left_on.keys
+    r_keys = right_on.keys
+    if l_keys == r_keys or len(r_data) == 0:
+        return l_data, r_data
+
+    # right values without a category in the left key are given values that can't match
+    name_to_l_value = {n: v for v, n in l_keys.items()}
+    r_min = int(min(np.min(r_data), min(r_keys.keys(), default=0)))
+    r_max = int(max(np.max(r_data), max(r_keys.keys(), default=0)))
+    unmatched = int(max(np.max(l_data, initial=0), max(l_keys.keys(), default=0))) + 1
+    remap = np.arange(unmatched, unmatched + r_max - r_min + 1, dtype=np.int64)
+    for v, n in r_keys.items():
+        if n in name_to_l_value:
+            remap[int(v) - r_min] = name_to_l_value[n]
+    return l_data.astype(np.int64), remap[r_data.astype(np.int64) - r_min]
+
+
+def _same_key_fields(a, b):
+    return len(a) == len(b) and all(x is y for x, y in zip(a, b))
+
+
+def _get_merge_maps(session, left_on_fields, right_on_fields, how, index_dtype):
+    """
+    Get the merge maps for a pair of key fields. Inside Session.reuse_merge_maps, the maps of an
+    earlier merge on the same key field objects with the same 'how' are reused rather than being
+    generated again.
+    """
+    cache = getattr(session, '_merge_maps', None)
+    compound = isinstance(left_on_fields, tuple)
+    l_fields = left_on_fields if compound else (left_on_fields,)
+    r_fields = right_on_fields if compound else (right_on_fields,)
+    if cache is not None:
+        for c_how, c_index_dtype, c_l_fields, c_r_fields, maps in cache:
+            if c_how == how and c_index_dtype == index_dtype and\
+                    _same_key_fields(l_fields, c_l_fields) and\
+                    _same_key_fields(r_fields, c_r_fields):
+                return maps
+
+    keys = [_get_merge_key_data(lf, rf) for lf, rf in zip(l_fields, r_fields)]
+    if compound:
+        l_key = tuple(k[0] for k in keys)
+        r_key = tuple(k[1] for k in keys)
+    else:
+        l_key, r_key = keys[0]
+    maps = ops.generate_merge_maps(l_key, r_key, how, index_dtype)
+    if cache is not None:
+        cache.append((how, index_dtype, l_fields, r_fields, maps))
+    return maps
+
+
+def _map_merge_field(src, dest, to_d_map, to_d_filt, all_valid):
+    """
+    Write the rows of 'src' to 'dest' through the merge map of the side that 'src' belongs to.
+    """
+    if src.indexed:
+        if all_valid:
+            i, v = ops.map_indexed_values_no_mask(src.indices[:], src.values[:], to_d_map)
+        else:
+            i, v = ops.safe_map_indexed_values(src.indices[:], src.values[:], to_d_map, to_d_filt)
+        dest.indices.write(i)
+        dest.values.write(v)
+    else:
+        if all_valid:
+            v = ops.map_values_no_mask(src.data[:], to_d_map)
+        else:
+            v = ops.safe_map_values(src.data[:], to_d_map, to_d_filt)
+        dest.data.write(v)
+
+
 def merge(left: DataFrame,
           right: DataFrame,
           dest: DataFrame,
@@ -555,58 +711,32 @@ def merge(left: DataFrame,
     else:
         index_dtype = np.int64
 
-    left_df_dict = {}
-    right_df_dict = {}
-    left_on_keys = []
-    right_on_keys = []
-    if isinstance(left_on_fields, tuple):
-        for i_f, f in enumerate(left_on_fields):
-            key = 'l_k_{}'.format(i_f)
-            left_df_dict[key] = f.data[:]
-            left_on_keys.append(key)
-        l_key = tuple(left_on_keys)
-        for i_f, f in enumerate(right_on_fields):
-            key = 'r_k_{}'.format(i_f)
-            right_df_dict[key] = f.data[:]
-            right_on_keys.append(key)
-        r_key = tuple(right_on_keys)
-    else:
-        l_key = 'l_k'
-        left_df_dict[l_key] = left_on_fields.data[:]
-        r_key = 'r_k'
-        right_df_dict[r_key] = right_on_fields.data[:]
-
-    left_df_dict['l_i'] = np.arange(left_len, dtype=index_dtype)
-    right_df_dict['r_i'] = np.arange(right_len, dtype=index_dtype)
-    # create the merging dataframes, using only the fields involved in the merge
-    l_df = pd.DataFrame(left_df_dict)
-    r_df = pd.DataFrame(right_df_dict)
-
-    df = pd.merge(left=l_df, right=r_df, left_on=l_key, right_on=r_key, how=how)
-
-    l_to_d_map = df['l_i'].to_numpy(dtype=np.int32)
-    l_to_d_filt = np.logical_not(df['l_i'].isnull()).to_numpy()
-    r_to_d_map = df['r_i'].to_numpy(dtype=np.int32)
-    r_to_d_filt = np.logical_not(df['r_i'].isnull()).to_numpy()
+    l_to_d_map, l_to_d_filt, r_to_d_map, r_to_d_filt =\
+        _get_merge_maps(left.dataset.session, left_on_fields, right_on_fields, how, index_dtype)
+    l_all_valid = bool(l_to_d_filt.all())
+    r_all_valid = bool(r_to_d_filt.all())
+    # left / right joins keep every row of that side in order, so if no row was repeated, the map
+    # from that side to the destination is the identity and its fields can be copied as they are
+    l_is_identity = how == 'left' and len(l_to_d_map) == left_len
+    r_is_identity = how == 'right' and len(r_to_d_map) == right_len
 
     # perform the mapping
     left_fields_ = left.keys() if left_fields is None else left_fields
     right_fields_ = right.keys() if right_fields is None else right_fields
 
+    # destination fields are created up front, in order, and then filled concurrently as the
+    # fields don't depend on each other
+    projections = []
     for f in left_fields_:
         dest_f = f
         if f in right_fields_:
             dest_f += left_suffix
         l = left[f]
-        d = l.create_like(dest, dest_f)
-        if l.indexed:
-            i, v = ops.safe_map_indexed_values(l.indices[:], l.values[:], l_to_d_map, l_to_d_filt)
-            d.indices.write(i)
-            d.values.write(v)
-        else:
-            v = ops.safe_map_values(l.data[:], l_to_d_map, l_to_d_filt)
-            d.data.write(v)
-    if np.all(l_to_d_filt) == False:
+        if l_is_identity:
+            _copy_field(l, dest, dest_f)
+            continue
+        projections.append((l, l.create_like(dest, dest_f), l_to_d_map, l_to_d_filt, l_all_valid))
+    if not l_all_valid:
         d = dest.create_numeric('valid'+left_suffix, 'bool')
         d.data.write(l_to_d_filt)
 
@@ -615,14 +745,26 @@ def merge(left: DataFrame,
         if f in left_fields_:
             dest_f += right_suffix
         r = right[f]
-        d = r.create_like(dest, dest_f)
-        if r.indexed:
-            i, v = ops.safe_map_indexed_values(r.indices[:], r.values[:], r_to_d_map, r_to_d_filt)
-            d.indices.write(i)
-            d.values.write(v)
-        else:
-            v = ops.safe_map_values(r.data[:], r_to_d_map, r_to_d_filt)
-            d.data.write(v)
-    if np.all(r_to_d_filt) == False:
+        if r_is_identity:
+            _copy_field(r, dest, dest_f)
+            continue
+        projections.append((r, r.create_like(dest, dest_f), r_to_d_map, r_to_d_filt, r_all_valid))
+    if not r_all_valid:
         d = dest.create_numeric('valid'+right_suffix, 'bool')
-        d.data.write(r_to_d_filt)
\ No newline at end of file
+        d.data.write(r_to_d_filt)
+
+    # indexed fields are mapped by kernels that are already parallel, and numba's parallel
+    # kernels can't be launched from other threads, so they stay on this thread
+    on_this_thread = [p for p in projections if p[0].indexed]
+    pooled = [p for p in projections if not p[0].indexed]
+    if len(pooled) > 0:
+        max_workers = min(8, len(pooled), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(_map_merge_field, *p) for p in pooled]
+            for p in on_this_thread:
+                _map_merge_field(*p)
+            for f in futures:
+                f.result()
+    else:
+        for p in on_this_thread:
+            _map_merge_field(*p)
\ No newline at end of file
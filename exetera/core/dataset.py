@@ -92,12 +92,7 @@ class HDF5Dataset(Dataset):
         _dataframe = edf.HDF5DataFrame(self, name, h5group)
         if dataframe is not None:
             for k, v in dataframe.items():
-                f = v.create_like(_dataframe, k)
-                if f.indexed:
-                    f.indices.write(v.indices[:])
-                    f.values.write(v.values[:])
-                else:
-                    f.data.write(v.data[:])
+                edf.copy(v, _dataframe, k)
 
         self._dataframes[name] = _dataframe
         return _dataframe
@@ -272,12 +267,7 @@ def copy(dataframe: DataFrame, dataset: Dataset, name: str):
     _dataframe = dataset.create_dataframe(name)
 
     for k, v in dataframe.items():
-        f = v.create_like(_dataframe, k)
-        if f.indexed:
-            f.indices.write(v.indices[:])
-            f.values.write(v.values[:])
-        else:
-            f.data.write(v.data[:])
+        edf.copy(v, _dataframe, k)
 
     dataset._dataframes[name] = _dataframe
 
@@ -10,16 +10,27 @@
 # limitations under the License.
 
 from typing import Callable, Optional, Union
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
 from datetime import datetime, timezone
+import os
+import sys
+import weakref
 
 import numpy as np
 import numba
 import h5py
+try:
+    from h5py._selector import Reader as _H5Reader
+except ImportError:
+    _H5Reader = None
 
 from exetera.core.abstract_types import Field
 from exetera.core.data_writer import DataWriter
 from exetera.core import operations as ops
 from exetera.core import validation as val
+from exetera.core import utils
 
 class HDF5Field(Field):
     def __init__(self, session, group, dataframe, write_enabled=False):
@@ -45,6 +56,9 @@ class HDF5Field(Field):
         self._write_enabled = write_enabled
         self._value_wrapper = None
         self._valid_reference = True
+        # attributes that are fixed when the field is created, read from hdf5 on first use
+        self._timestamp = None
+        self._chunksize = None
 
     @property
     def valid(self):
@@ -79,7 +93,9 @@ class HDF5Field(Field):
         was created.
         """
         self._ensure_valid()
-        return self._field.attrs['timestamp']
+        if self._timestamp is None:
+            self._timestamp = self._field.attrs['timestamp']
+        return self._timestamp
 
     @property
     def chunksize(self):
@@ -88,7 +104,9 @@ class HDF5Field(Field):
         ignored depending on the storage medium.
         """
         self._ensure_valid()
-        return self._field.attrs['chunksize']
+        if self._chunksize is None:
+            self._chunksize = self._field.attrs['chunksize']
+        return self._chunksize
 
     @property
     def indexed(self):
@@ -181,6 +199,106 @@ class MemoryField(Field):
 # ============
 
 
+# hdf5 fields longer than this are filtered in windows of this many entries
+FILTER_STREAM_LENGTH = 1 << 20
+
+# indices that select at most a quarter of an hdf5 field, in runs of consecutive entries that
+# are at least this long on average, are applied by reading the runs, rather than by reading
+# and indexing the whole field
+INDEX_RUN_READ_MIN_LENGTH = 1 << 12
+
+# whole datasets at least this long are read with read_direct, which copies straight into a new
+# array and is faster than slicing for large reads, though slower for small ones
+READ_DIRECT_MIN_LENGTH = 1 << 16
+
+
+def _read_all(dataset):
+    if len(dataset) < READ_DIRECT_MIN_LENGTH or dataset.dtype.kind == 'O':
+        return dataset[:]
+    result = np.empty(dataset.shape, dtype=dataset.dtype)
+    dataset.read_direct(result)
+    return result
+
+
+def _read_windows(array):
+    """
+    Yield the data of the hdf5 dataset behind array a window at a time, each read into the same
+    buffer, so that only one window of the data is ever in memory.
+    """
+    dataset = array._dataset
+    length = len(dataset)
+    step = _chunk_aligned_length(ops.DEFAULT_CHUNKSIZE, array)
+    buffer = np.empty(min(length, step), dtype=array.dtype)
+    for start in range(0, length, step):
+        window = buffer[:min(step, length - start)]
+        dataset.read_direct(window, np.s_[start:start + len(window)])
+        yield window
+
+
+def _streamed_sum(array, dtype):
+    total = np.zeros(0, dtype=array.dtype).sum(dtype=dtype)
+    for window in _read_windows(array):
+        total += window.sum(dtype=dtype)
+    return total
+
+
+def _streamed_unique(array):
+    # the distinct values of each window are merged as they are found, so only the distinct
+    # values, rather than the whole field, are held along with the window
+    result = np.zeros(0, dtype=array.dtype)
+    for window in _read_windows(array):
+        result = np.union1d(result, window)
+    return result
+
+
+class _SliceReader:
+    """
+    Reads slices of a numeric hdf5 dataset through a cached h5py reader, skipping the checks
+    and selection handling that slicing the dataset repeats on every read, which dominate the
+    cost of small reads. The reader is rebuilt whenever the dataset's shape has changed, as it
+    only knows the shape the dataset had when it was created.
+
+    The cached reader is private to h5py, so if it isn't available, or fails, contiguous slices
+    are read with read_direct instead, which is public but repeats some of those checks.
+    """
+    def __init__(self, dataset):
+        self._dataset = dataset
+        self._reader = None
+        self._shape = None
+        try:
+            self._enabled = _H5Reader is not None and bool(dataset._fast_read_ok)
+        except AttributeError:
+            self._enabled = False
+
+    def _read_direct(self, item):
+        dataset = self._dataset
+        if dataset.ndim != 1 or item.step not in (None, 1):
+            return dataset[item]
+        start, stop, _ = item.indices(len(dataset))
+        result = np.empty(max(stop - start, 0), dtype=dataset.dtype)
+        if len(result) > 0:
+            dataset.read_direct(result, np.s_[start:stop])
+        return result
+
+    def read(self, item):
+        if not self._enabled:
+            return self._read_direct(item)
+        shape = self._dataset.id.shape
+        if shape != self._shape:
+            try:
+                self._reader = _H5Reader(self._dataset.id)
+            except Exception:
+                # the private reader's interface isn't stable across h5py versions
+                self._enabled = False
+                return self._read_direct(item)
+            self._shape = shape
+        try:
+            return self._reader.read((item,))
+        except TypeError:
+            # selections the reader doesn't handle, which slicing the dataset falls back for too
+            return self._dataset[item]
+
+
 class ReadOnlyFieldArray:
     def __init__(self, field, dataset_name):
         """
@@ -194,15 +312,21 @@ class ReadOnlyFieldArray:
         self._field = field
         self._name = dataset_name
         self._dataset = field[dataset_name]
+        self._dtype = self._dataset.dtype
+        self._reader = _SliceReader(self._dataset)
 
     def __len__(self):
         return len(self._dataset)
 
     @property
     def dtype(self):
-        return self._dataset.dtype
+        return self._dtype
 
     def __getitem__(self, item):
+        if isinstance(item, slice):
+            if item == slice(None):
+                return _read_all(self._dataset)
+            return self._reader.read(item)
         return self._dataset[item]
 
     def __setitem__(self, key, value):
@@ -225,6 +349,29 @@ class ReadOnlyFieldArray:
         raise PermissionError("This field was created read-only; call <field>.writeable() "
                               "for a writeable copy of the field")
 
+    def sum(self, dtype=None):
+        """
+        Sum the data, a window of the dataset at a time, so that only one window of the data
+        is ever in memory.
+
+        :param dtype: The dtype to sum in, as for np.sum.
+        :return: The sum of the data.
+        """
+        return _streamed_sum(self, dtype)
+
+    def unique(self):
+        """
+        Find the sorted distinct values of the data, a window of the dataset at a time, as
+        np.unique would for the whole of the data.
+
+        :return: A numpy array of the distinct values.
+        """
+        return _streamed_unique(self)
+
+    def inplace_apply(self, ufunc, value):
+        raise PermissionError("This field was created read-only; call <field>.writeable() "
+                              "for a writeable copy of the field")
+
 
 class WriteableFieldArray:
     def __init__(self, field, dataset_name):
@@ -239,37 +386,94 @@ class WriteableFieldArray:
         self._field = field
         self._name = dataset_name
         self._dataset = field[dataset_name]
+        self._dtype = self._dataset.dtype
+        self._reader = _SliceReader(self._dataset)
+        # whether this array has marked its dataset as completed, which is never unmarked
+        # other than by clearing the dataset, so it only needs doing once
+        self._completed = False
 
     def __len__(self):
         return len(self._dataset)
 
     @property
     def dtype(self):
-        return self._dataset.dtype
+        return self._dtype
 
     def __getitem__(self, item):
+        if isinstance(item, slice):
+            if item == slice(None):
+                return _read_all(self._dataset)
+            return self._reader.read(item)
         return self._dataset[item]
 
     def __setitem__(self, key, value):
-        self._dataset[key] = value
+        if isinstance(key, slice) and key == slice(None) and isinstance(value, np.ndarray) and\
+                value.dtype == self._dtype and value.flags.c_contiguous and\
+                0 < len(value) == len(self._dataset):
+            # the array already has the dataset's layout, so hdf5 can write it without the
+            # selection handling and conversion that slice assignment goes through
+            self._dataset.write_direct(value)
+        else:
+            self._dataset[key] = value
 
     def clear(self):
-        nformat = self._dataset.dtype
+        nformat = self._dtype
         DataWriter._clear_dataset(self._field, self._name)
         DataWriter.write(self._field, self._name, [], 0, nformat)
         self._dataset = self._field[self._name]
+        self._reader = _SliceReader(self._dataset)
+        self._completed = False
 
     def write_part(self, part):
-        DataWriter.write(self._field, self._name, part, len(part), dtype=self._dataset.dtype)
+        DataWriter.write(self._field, self._name, part, len(part), dtype=self._dtype)
 
     def write(self, part):
         if isinstance(part, Field):
             part = part.data[:]
-        DataWriter.write(self._field, self._name, part, len(part), dtype=self._dataset.dtype)
+        DataWriter.write(self._field, self._name, part, len(part), dtype=self._dtype)
         self.complete()
 
     def complete(self):
-        DataWriter.flush(self._field[self._name])
+        if not self._completed:
+            DataWriter._flush(self._dataset)
+            self._completed = True
+
+    def sum(self, dtype=None):
+        """
+        Sum the data, a window of the dataset at a time, so that only one window of the data
+        is ever in memory.
+
+        :param dtype: The dtype to sum in, as for np.sum.
+        :return: The sum of the data.
+        """
+        return _streamed_sum(self, dtype)
+
+    def unique(self):
+        """
+        Find the sorted distinct values of the data, a window of the dataset at a time, as
+        np.unique would for the whole of the data.
+
+        :return: A numpy array of the distinct values.
+        """
+        return _streamed_unique(self)
+
+    def inplace_apply(self, ufunc, value):
+        """
+        Replace the data with ufunc(data, value), a window of the dataset at a time, so that
+        only one window of the data is ever in memory and no temporaries are made.
+
+        :param ufunc: A numpy ufunc taking two arguments, such as np.multiply.
+        :param value: The second argument to ufunc.
+        """
+        length = len(self._dataset)
+        step = _chunk_aligned_length(ops.DEFAULT_CHUNKSIZE, self)
+        buffer = np.empty(min(length, step), dtype=self._dtype)
+        for start in range(0, length, step):
+            window = buffer[:min(step, length - start)]
+            source = np.s_[start:start + len(window)]
+            self._dataset.read_direct(window, source)
+            ufunc(window, value, out=window)
+            self._dataset.write_direct(window, dest_sel=source)
 
 
 class MemoryFieldArray:
@@ -323,6 +527,50 @@ class MemoryFieldArray:
     def complete(self):
         pass
 
+    def sum(self, dtype=None):
+        if self._dataset is None:
+            raise ValueError("Cannot get data from an empty Field")
+        return self._dataset.sum(dtype=dtype)
+
+    def unique(self):
+        if self._dataset is None:
+            raise ValueError("Cannot get data from an empty Field")
+        return np.unique(self._dataset)
+
+    def inplace_apply(self, ufunc, value):
+        if self._dataset is not None:
+            ufunc(self._dataset, value, out=self._dataset)
+
+
+# single entries of indexed fields are looked up in pages of this many index entries
+INDEX_PAGE_LENGTH = 1 << 12
+
+
+class _IndexPage:
+    """
+    The most recently read page of an index, from which the start and stop of single entries
+    of an indexed field are looked up, so that iterating over the entries reads the index a
+    page at a time rather than an entry at a time. The page is reread whenever the index's
+    length has changed since it was read.
+    """
+    def __init__(self, indices):
+        self._indices = indices
+        self.clear()
+
+    def clear(self):
+        self._page = None
+        self._page_start = 0
+        self._index_length = None
+
+    def span(self, item, index_length):
+        offset = item - self._page_start
+        if index_length != self._index_length or not 0 <= offset < len(self._page) - 1:
+            self._page_start = item - item % INDEX_PAGE_LENGTH
+            self._page = self._indices[self._page_start:self._page_start + INDEX_PAGE_LENGTH + 1]
+            self._index_length = index_length
+            offset = item - self._page_start
+        return self._page[offset], self._page[offset + 1]
+
 
 class ReadOnlyIndexedFieldArray:
     def __init__(self, field, indices, values):
@@ -338,6 +586,7 @@ class ReadOnlyIndexedFieldArray:
         self._field = field
         self._indices = indices
         self._values = values
+        self._index_page = _IndexPage(indices)
 
     def __len__(self):
         # TODO: this occurs because of the initialized state of an indexed string. It would be better for the
@@ -357,17 +606,15 @@ class ReadOnlyIndexedFieldArray:
                 #TODO: validate slice
                 index = self._indices[start:stop+1]
                 bytestr = self._values[index[0]:index[-1]]
-                results = [None] * (len(index)-1)
-                startindex = start
-                for ir in range(len(results)):
-                    results[ir] =\
-                        bytestr[index[ir]-np.int64(startindex):
-                                index[ir+1]-np.int64(startindex)].tobytes().decode()
-                return results
+                return ops.indexed_values_to_strings(index, bytestr)
             elif isinstance(item, int):
-                if item >= len(self._indices) - 1:
+                index_length = len(self._indices)
+                if item >= index_length - 1:
                     raise ValueError("index is out of range")
-                start, stop = self._indices[item:item+2]
+                if item >= 0:
+                    start, stop = self._index_page.span(item, index_length)
+                else:
+                    start, stop = self._indices[item:item+2]
                 if start == stop:
                     return ''
                 value = self._values[start:stop].tobytes().decode()
@@ -397,16 +644,38 @@ class ReadOnlyIndexedFieldArray:
                               "for a writeable copy of the field")
 
 
+def _chunk_aligned_length(length, array):
+    """
+    Round length down to a whole number of the chunks of the dataset behind array, if it has
+    one and length spans at least one chunk.
+    """
+    dataset = getattr(array, '_dataset', None)
+    chunks = getattr(dataset, 'chunks', None)
+    if chunks is None or chunks[0] > length:
+        return length
+    return length - length % chunks[0]
+
+
 class WriteableIndexedFieldArray:
     def __init__(self, chunksize, indices, values):
         # self._field = field
         self._indices = indices
         self._values = values
+        self._index_page = _IndexPage(indices)
         # self._chunksize = self._field.attrs['chunksize']
         self._chunksize = chunksize
-        self._raw_values = np.zeros(self._chunksize, dtype=np.uint8)
-        self._raw_indices = np.zeros(self._chunksize, dtype=np.int64)
+        # the buffers are only ever written through slices and then read up to the filled
+        # position, so they needn't be zeroed. Their lengths are whole numbers of dataset chunks,
+        # so that each write fills chunks rather than leaving hdf5 to read and rewrite partial
+        # ones
+        self._raw_values = np.empty(_chunk_aligned_length(self._chunksize, self._values),
+                                    dtype=np.uint8)
+        self._raw_indices = np.empty(_chunk_aligned_length(self._chunksize, self._indices),
+                                     dtype=np.int64)
         self._accumulated = self._indices[-1] if len(self._indices) > 0 else 0
+        # whether the leading zero of the index has been written or buffered, tracked here
+        # rather than by asking the index for its length before each write
+        self._index_initialized = len(self._indices) > 0
         self._index_index = 0
         self._value_index = 0
 
@@ -427,19 +696,15 @@ class WriteableIndexedFieldArray:
 
                 index = self._indices[start:stop+1]
                 bytestr = self._values[index[0]:index[-1]]
-                results = [None] * (len(index) - 1)
-                startindex = start
-                rmax = min(len(results), stop - start)
-                for ir in range(rmax):
-                    rbytes = bytestr[index[ir] - np.int64(startindex):
-                                index[ir + 1] - np.int64(startindex)].tobytes()
-                    rstr = rbytes.decode()
-                    results[ir] = rstr
-                return results
+                return ops.indexed_values_to_strings(index, bytestr)
             elif isinstance(item, int):
-                if item >= len(self._indices) - 1:
+                index_length = len(self._indices)
+                if item >= index_length - 1:
                     raise ValueError("index is out of range")
-                start, stop = self._indices[item:item+2]
+                if item >= 0:
+                    start, stop = self._index_page.span(item, index_length)
+                else:
+                    start, stop = self._indices[item:item+2]
                 if start == stop:
                     return ''
                 value = self._values[start:stop].tobytes().decode()
@@ -456,25 +721,52 @@ class WriteableIndexedFieldArray:
         self._accumulated = 0
         self._indices.clear()
         self._values.clear()
-        self._accumulated = 0
+        self._index_initialized = False
+        self._index_page.clear()
+        # anything still buffered belongs to the cleared data, so the buffers are reset
+        # rather than reallocated
+        self._index_index = 0
+        self._value_index = 0
 
     def write_part(self, part):
-        for s in part:
-            evalue = s.encode()
-            for v in evalue:
-                self._raw_values[self._value_index] = v
-                self._value_index += 1
-                if self._value_index == self._chunksize:
-                    self._values.write_part(self._raw_values[:self._value_index])
-                    self._value_index = 0
-                self._accumulated += 1
-            self._raw_indices[self._index_index] = self._accumulated
-            self._index_index += 1
-            if self._index_index == self._chunksize:
-                if len(self._indices) == 0:
-                    self._indices.write_part(np.array([0]))
-                self._indices.write_part(self._raw_indices[:self._index_index])
-                self._index_index = 0
+        encoded, lengths = utils.encode_strings(part)
+        indices = np.cumsum(lengths)
+        indices += self._accumulated
+        if len(indices) > 0:
+            self._accumulated = indices[-1]
+            if not self._index_initialized:
+                # the leading zero is buffered with the rest of the index, rather than written
+                # on its own, so that the index's writes stay aligned to its chunks
+                self._raw_indices[0] = 0
+                self._index_index = 1
+                self._index_initialized = True
+        self._value_index = self._buffer(self._raw_values, self._value_index, encoded,
+                                         self._values.write_part)
+        self._index_index = self._buffer(self._raw_indices, self._index_index, indices,
+                                         self._indices.write_part)
+
+    def _buffer(self, buffer, buffer_index, data, write_part):
+        """
+        Copy data into buffer from buffer_index onwards, passing the buffer to write_part each
+        time it fills, and return the index of the buffer's first unused element. Spans of data
+        that would fill an empty buffer are passed to write_part directly.
+        """
+        start = 0
+        while start < len(data):
+            if buffer_index == 0 and len(data) - start >= len(buffer):
+                # a whole buffer's worth of data is written straight from data, as copying it
+                # into the buffer first would gain nothing
+                write_part(data[start:start + len(buffer)])
+                start += len(buffer)
+                continue
+            count = min(len(buffer) - buffer_index, len(data) - start)
+            buffer[buffer_index:buffer_index + count] = data[start:start + count]
+            buffer_index += count
+            start += count
+            if buffer_index == len(buffer):
+                write_part(buffer)
+                buffer_index = 0
+        return buffer_index
 
     def write(self, part):
         self.write_part(part)
@@ -485,8 +777,6 @@ class WriteableIndexedFieldArray:
             self._values.write(self._raw_values[:self._value_index])
             self._value_index = 0
         if self._index_index != 0:
-            if len(self._indices) == 0:
-                self._indices.write_part(np.array([0]))
             self._indices.write(self._raw_indices[:self._index_index])
             self._index_index = 0
 
@@ -552,6 +842,18 @@ class IndexedStringMemField(MemoryField):
     def get_spans(self):
         return ops._get_spans_for_index_string_field(self.indices[:], self.values[:])
 
+    def append_suffix(self, suffix):
+        """
+        Append suffix to every entry of this field, in place. The entries are extended in bulk,
+        through their indices and values, rather than being decoded, extended and rewritten one
+        string at a time.
+
+        :param suffix: the str or bytes to append to each entry. A str is appended as its utf-8
+            encoding
+        :return: This field.
+        """
+        return FieldDataOps.append_suffix_to_indexed_field(self, suffix)
+
     def apply_filter(self, filter_to_apply, target=None, in_place=False):
         """
         Apply a boolean filter to this field. This operation doesn't modify the field on which it
@@ -1122,7 +1424,8 @@ def categorical_field_constructor(session, group, name, nformat, key,
     key_ = val.validate_and_normalize_categorical_key('key', key)
     key_values = [v for k, v in key_.items()]
     key_names = [k for k, v in key_.items()]
-    DataWriter.write(field, 'key_values', key_values, len(key_values), 'int8')
+    # the key values are stored in the field's value type, which holds every key value
+    DataWriter.write(field, 'key_values', key_values, len(key_values), nformat)
     DataWriter.write(field, 'key_names', key_names, len(key_names), h5py.special_dtype(vlen=str))
 
 
@@ -1216,6 +1519,19 @@ class IndexedStringField(HDF5Field):
         self._ensure_valid()
         return ops._get_spans_for_index_string_field(self.indices[:], self.values[:])
 
+    def append_suffix(self, suffix):
+        """
+        Append suffix to every entry of this field, in place. The entries are extended in bulk,
+        through their indices and values, rather than being decoded, extended and rewritten one
+        string at a time.
+
+        :param suffix: the str or bytes to append to each entry. A str is appended as its utf-8
+            encoding
+        :return: This field.
+        """
+        self._ensure_valid()
+        return FieldDataOps.append_suffix_to_indexed_field(self, suffix)
+
     def apply_filter(self, filter_to_apply, target=None, in_place=False):
         """
         Apply a boolean filter to this field. This operation doesn't modify the field on which it
@@ -1576,6 +1892,8 @@ class CategoricalField(HDF5Field):
     def __init__(self, session, group, dataframe, write_enabled=False):
         super().__init__(session, group, dataframe, write_enabled=write_enabled)
         self._nformat = self._field.attrs['nformat'] if 'nformat' in self._field.attrs else 'int8'
+        # the keys are written when the field is created, so they are read from hdf5 on first use
+        self._keys = None
 
     def writeable(self):
         self._ensure_valid()
@@ -1621,10 +1939,10 @@ class CategoricalField(HDF5Field):
     @property
     def keys(self):
         self._ensure_valid()
-        kv = self._field['key_values']
-        kn = self._field['key_names']
-        keys = dict(zip(kv, kn))
-        return keys
+        if self._keys is None:
+            self._keys = dict(zip(self._field['key_values'][:], self._field['key_names'][:]))
+        # a copy, so that changes made by the caller don't alter the cached keys
+        return dict(self._keys)
 
     def remap(self, key_map, new_key):
         self._ensure_valid()
@@ -1906,7 +2224,8 @@ class FixedStringImporter:
         self._field = group.create_fixed_string(name, length, timestamp, chunksize)
 
     def chunk_factory(self, length):
-        return np.zeros(length, dtype=self._field.data.dtype)
+        # chunks are filled by the caller before being written, so they needn't be zeroed
+        return np.empty(length, dtype=self._field.data.dtype)
 
     def write_part(self, values):
         self._field.data.write_part(values)
@@ -1926,18 +2245,26 @@ class NumericImporter:
         self._filter_field = group.create_numeric(filter_name, 'bool', timestamp, chunksize)
         chunksize = session.chunksize if chunksize is None else chunksize
         self._parser = parser
-        self._values = np.zeros(chunksize, dtype=self._field.data.dtype)
-        self._filter_values = np.zeros(chunksize, dtype='bool')
+        self._converter = getattr(parser, 'converter', None)
+        # write_part sets every entry of the buffers that it writes, so they needn't be zeroed
+        self._values = np.empty(chunksize, dtype=self._field.data.dtype)
+        self._filter_values = np.empty(chunksize, dtype='bool')
 
     def chunk_factory(self, length):
         # return np.zeros(length, dtype=self._field.data.dtype)
         return [None] * length
 
     def write_part(self, values):
-        for i in range(len(values)):
-            valid, value = self._parser(values[i])
-            self._values[i] = value
-            self._filter_values[i] = valid
+        if self._converter is not None:
+            results, invalid_rows = utils.convert_all_numbers(self._converter, values)
+            self._values[:len(values)] = results
+            self._filter_values[:len(values)] = True
+            self._filter_values[invalid_rows] = False
+        else:
+            for i in range(len(values)):
+                valid, value = self._parser(values[i])
+                self._values[i] = value
+                self._filter_values[i] = valid
         self._field.data.write_part(self._values[:len(values)])
         self._filter_field.data.write_part(self._filter_values[:len(values)])
 
@@ -1950,13 +2277,32 @@ class NumericImporter:
         self.complete()
 
 
+def _categorical_value_type(value_type, keys):
+    """
+    The narrowest of value_type and int8 that holds every value of keys, as well as the -1
+    that leaky categoricals use for values that aren't keys. Categoricals rarely have values
+    that need more than int8, so this saves the bytes of a wider type on every read and write.
+    """
+    dtype = np.dtype(value_type)
+    if dtype.kind != 'i' or dtype.itemsize == 1:
+        return value_type
+    info = np.iinfo(np.int8)
+    if all(info.min <= v <= info.max for v in keys.values()):
+        return 'int8'
+    return value_type
+
+
 class CategoricalImporter:
-    def __init__(self, session, group, name, value_type, keys, timestamp=None, chunksize=None):
+    def __init__(self, session, group, name, value_type, keys, timestamp=None, chunksize=None,
+                 key_size=None):
         chunksize = session.chunksize if chunksize is None else chunksize
+        value_type = _categorical_value_type(value_type, keys)
         self._field = group.create_categorical(name, value_type, keys, timestamp, chunksize)
         self._keys = keys
         self._dtype = value_type
-        self._key_type = 'U{}'.format(max(len(k.encode()) for k in keys))
+        if key_size is None:
+            key_size = max(len(k.encode()) for k in keys)
+        self._key_type = 'U{}'.format(key_size)
         # self._results = np.zeros(chunksize, dtype=value_type)
 
     def chunk_factory(self, length):
@@ -1976,39 +2322,51 @@ class CategoricalImporter:
 
 class LeakyCategoricalImporter:
     def __init__(self, session, group, name, value_type, keys, out_of_range,
-                 timestamp=None, chunksize=None):
+                 timestamp=None, chunksize=None, key_size=None):
         chunksize = session.chunksize if chunksize is None else chunksize
         out_of_range_name = '{}_{}'.format(name, out_of_range)
+        value_type = _categorical_value_type(value_type, keys)
         self._field = group.create_categorical(name, value_type, keys, timestamp, chunksize)
         self._str_field = group.create_indexed_string(out_of_range_name, timestamp, chunksize)
         self._keys = keys
         self._dtype = value_type
-        self._key_type = 'S{}'.format(max(len(k.encode()) for k in keys))
+        if key_size is None:
+            key_size = max(len(k.encode()) for k in keys)
+        self._key_type = 'S{}'.format(key_size)
+        # the keys in sorted order with their values, for looking up parts that are arrays
+        key_names = np.array(list(keys.keys()))
+        order = np.argsort(key_names)
+        self._sorted_key_names = key_names[order]
+        self._sorted_key_values = np.array(list(keys.values()), dtype=np.int64)[order]
 
         self._results = np.zeros(chunksize, dtype=value_type)
-        self._strresult = [None] * chunksize
 
     def chunk_factory(self, length):
         return [None] * length
 
+    def _array_codes(self, values):
+        # a binary search of the sorted keys for every value at once, which for arrays is
+        # faster than a dict lookup of each value
+        names = self._sorted_key_names
+        found = np.searchsorted(names, values).clip(max=len(names) - 1)
+        return np.where(names[found] == values, self._sorted_key_values[found], -1)
+
     def write_part(self, values):
-        keys = self._keys
-        results = self._results
-        strresults = self._strresult
-        for i in range(len(values)):
-            value = keys.get(values[i], -1)
-            if value == -1:
-                strresults[i] = values[i]
-            else:
-                strresults[i] = ''
-            results[i] = value
-            # results = keys[values[i]]
-        if len(values) != len(results):
-            self._field.data.write_part(results[:len(values)])
-            self._str_field.data.write_part(strresults[:len(values)])
+        # the keys are looked up for the whole part, and only the values that aren't keys are
+        # visited individually, to be copied to the freetext field
+        if isinstance(values, np.ndarray) and len(self._sorted_key_names) > 0 and\
+                values.dtype.kind == self._sorted_key_names.dtype.kind:
+            codes = self._array_codes(values)
         else:
-            self._field.data.write_part(results)
-            self._str_field.data.write_part(strresults)
+            codes = np.fromiter(map(self._keys.get, values, repeat(-1)), dtype=np.int64,
+                                count=len(values))
+        results = self._results[:len(values)]
+        results[:] = codes
+        strresults = [''] * len(values)
+        for i in np.flatnonzero(codes == -1).tolist():
+            strresults[i] = values[i]
+        self._field.data.write_part(results)
+        self._str_field.data.write_part(strresults)
 
     def complete(self):
         self._field.data.complete()
@@ -2019,6 +2377,28 @@ class LeakyCategoricalImporter:
         self.complete()
 
 
+class _ParseThreads:
+    """
+    The thread per cpu on which an importer parses its parts, created when a part is first
+    long enough to be split between them, and shut down when the importer completes.
+    """
+    def __init__(self):
+        self._executor = None
+
+    def executor(self, length):
+        workers = os.cpu_count() or 1
+        if workers == 1 or length < utils.PARSE_SPLIT_MIN_LENGTH:
+            return None
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=workers)
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+
 class DateTimeImporter:
     def __init__(self, session, group, name,
                  optional=False, write_days=False, timestamp=None, chunksize=None):
@@ -2026,76 +2406,118 @@ class DateTimeImporter:
         self._field = group.create_timestamp(name, timestamp, chunksize)
         self._results = np.zeros(chunksize, dtype=np.float64)
         self._optional = optional
+        self._threads = _ParseThreads()
 
+        self._filter_field = None
         if optional is True:
             filter_name = '{}_set'.format(name)
-            numeric_field_constructor(group, filter_name, 'bool', timestamp, chunksize)
-            self._filter_field = NumericField(session, group, None, filter_name,
-                                              write_enabled=True)
+            self._filter_field = group.create_numeric(filter_name, 'bool', timestamp, chunksize)
 
     def chunk_factory(self, length):
-        return np.zeros(length, dtype='U32')
+        # datetimes are ascii, so chunks hold them as bytes, a quarter of the size of unicode;
+        # chunks are filled before they are written, so they needn't be zeroed
+        return np.empty(length, dtype='S32')
+
+    def _timestamps(self, values):
+        values = np.asarray(values)
+        if values.dtype.kind == 'S':
+            values = np.ascontiguousarray(values, dtype='S32')
+            raw = values.view(np.uint8).reshape(-1, 32)
+            first_non_ascii = -1
+        else:
+            values = np.asarray(values, dtype='U32')
+            codes = values.view(np.uint32).reshape(-1, 32)
+            non_ascii = np.flatnonzero((codes > 127).any(axis=1))
+            first_non_ascii = non_ascii[0] if len(non_ascii) > 0 else -1
+            raw = codes.astype(np.uint8)
+        if len(values) <= len(self._results):
+            results = self._results[:len(values)]
+        else:
+            results = np.zeros(len(values), dtype=np.float64)
+
+        # the values are decoded by a kernel specialised to the importer's two layouts, which
+        # checks each value's length and layout, and applies its '+HH:MM' utc offset
+        first_bad = utils._parse_in_slices(self._threads.executor(len(raw)),
+                                           utils._parse_aware_datetime_bytes, raw, (results,),
+                                           self._optional is True)
+        if first_non_ascii != -1 and (first_bad == -1 or first_non_ascii < first_bad):
+            first_bad = first_non_ascii
+        if first_bad != -1:
+            msg = "Date field '{}' has unexpected format '{}'"
+            raise ValueError(msg.format(self._field, values[first_bad]))
+        return results
 
     def write_part(self, values):
-        results = self._results
-
-        for i, v in enumerate(values):
-            if len(v) == 32:
-                ts = datetime.strptime(v, '%Y-%m-%d %H:%M:%S.%f%z')
-                results[i] = ts.timestamp()
-            elif len(v) == 25:
-                ts = datetime.strptime(v, '%Y-%m-%d %H:%M:%S%z')
-                results[i] = ts.timestamp()
-            else:
-                if self._optional is True and len(v) == 0:
-                    results[i] = np.nan
-                else:
-                    msg = "Date field '{}' has unexpected format '{}'"
-                    raise ValueError(msg.format(self._field, v))
-
+        results = self._timestamps(values)
         self._field.data.write_part(results)
+        if self._filter_field is not None:
+            # the kernel sets empty values to nan, which no parsed value can be
+            self._filter_field.data.write_part(~np.isnan(results))
 
     def complete(self):
+        self._threads.shutdown()
         self._field.data.complete()
+        if self._filter_field is not None:
+            self._filter_field.data.complete()
 
     def write(self, values):
-        self.write_part(values)
-        self.complete()
+        # the values are the whole of the field, so each dataset is written and completed in
+        # a single call rather than through write_part and complete
+        results = self._timestamps(values)
+        self._threads.shutdown()
+        self._field.data.write(results)
+        if self._filter_field is not None:
+            self._filter_field.data.write(~np.isnan(results))
 
 
 class DateImporter:
     def __init__(self, session, group, name,
                  optional=False, timestamp=None, chunksize=None):
+        chunksize = session.chunksize if chunksize is None else chunksize
         self._field = group.create_timestamp(name, timestamp, chunksize)
-        self._results = np.zeros(() if chunksize is None else chunksize, dtype='float64')
+        # every entry of a part is written to, so the buffer needn't be zeroed
+        self._results = np.empty(chunksize, dtype=np.float64)
+        self._threads = _ParseThreads()
 
+        self._filter_field = None
         if optional is True:
             filter_name = '{}_set'.format(name)
-            numeric_field_constructor(session, group, filter_name, 'bool',
-                                      timestamp, chunksize)
-            self._filter_field = NumericField(session, group, None, filter_name,
-                                              write_enabled=True)
+            self._filter_field = group.create_numeric(filter_name, 'bool', timestamp, chunksize)
 
     def chunk_factory(self, length):
-        return np.zeros(length, dtype='U10')
+        # as with datetimes, dates are held as ascii bytes
+        return np.empty(length, dtype='S10')
+
+    def _timestamps(self, values):
+        filled = np.zeros(len(values), dtype=bool)
+        if len(values) <= len(self._results):
+            out = self._results[:len(values)]
+        else:
+            out = None
+        timestamps = utils.date_bytes_to_timestamps(values, filled, out,
+                                                    self._threads.executor(len(values)))
+        timestamps[~filled] = np.nan
+        return timestamps, filled
 
     def write_part(self, values):
-        timestamps = np.zeros(len(values), dtype=np.float64)
-        for i in range(len(values)):
-            value = values[i]
-            if value == '':
-                timestamps[i] = np.nan
-            else:
-                ts = datetime.strptime(value, '%Y-%m-%d')
-                timestamps[i] = ts.timestamp()
+        timestamps, filled = self._timestamps(values)
         self._field.data.write_part(timestamps)
+        if self._filter_field is not None:
+            self._filter_field.data.write_part(filled)
 
     def complete(self):
+        self._threads.shutdown()
         self._field.data.complete()
+        if self._filter_field is not None:
+            self._filter_field.data.complete()
 
     def write(self, values):
-        self.write_part(values)
-        self.complete()
+        # as for datetimes, each dataset is written and completed in a single call
+        timestamps, filled = self._timestamps(values)
+        self._threads.shutdown()
+        self._field.data.write(timestamps)
+        if self._filter_field is not None:
+            self._filter_field.data.write(filled)
 
 
 # Operation implementations
@@ -2156,174 +2578,212 @@ def dtype_to_str(dtype):
     raise ValueError("Unsupported dtype '{}'".format(dtype))
 
 
+class OperationBufferPool:
+    """
+    The arrays of the temporary results of field operations inside Session.fused_ops, returned
+    to the pool as the fields holding them are released, for later operations whose results
+    have the same dtype and shape to be written into. An array is only handed out again once
+    nothing but the pool refers to it, so the data of a field or a view that is still in use
+    is never overwritten.
+    """
+    def __init__(self):
+        self._arrays = defaultdict(list)
+        self._closed = False
+
+    def track(self, field):
+        # the finalizer holds the field's array wrapper rather than the field, so that the
+        # field can be released, and reads the wrapper's array then, as it may have changed
+        weakref.finalize(field, self._release, field.data)
+
+    def _release(self, wrapper):
+        array = wrapper._dataset
+        if not self._closed and isinstance(array, np.ndarray) and array.flags.owndata and\
+                array.flags.writeable:
+            self._arrays[(array.dtype, array.shape)].append(array)
+
+    def acquire(self, dtype, shape):
+        arrays = self._arrays.get((dtype, shape))
+        while arrays:
+            array = arrays.pop()
+            # the only references left should be this function's and getrefcount's own; any
+            # other is a view or an array that something still uses, so it isn't reused
+            if sys.getrefcount(array) <= 2:
+                return array
+        return None
+
+    def close(self):
+        self._closed = True
+        self._arrays.clear()
+
+
 class FieldDataOps:
 
     @staticmethod
-    def _binary_op(session, first, second, function):
-        if isinstance(first, Field):
-            first_data = first.data[:]
-        else:
-            first_data = first
+    def _operand_data(operand):
+        """
+        Get the data of an operand, and whether the operation may overwrite it, which it may
+        for the new arrays that reads of hdf5 fields return.
+        """
+        if isinstance(operand, HDF5Field):
+            return operand.data[:], True
+        if isinstance(operand, Field):
+            return operand.data[:], False
+        return operand, False
 
-        if isinstance(second, Field):
-            second_data = second.data[:]
-        else:
-            second_data = second
+    @staticmethod
+    def _result_layout(function, operands):
+        """
+        Get the dtype and shape of the result of function on operands, or None if they can't
+        be found without performing it.
+        """
+        # the dtype is found from empty slices of the operands, so that scalars and arrays are
+        # promoted just as they are for the operation itself
+        empties = [d[:0] if isinstance(d, np.ndarray) and d.ndim > 0 else d for d in operands]
+        try:
+            return function(*empties).dtype, np.broadcast(*operands).shape
+        except (ValueError, TypeError):
+            return None
 
-        r = function(first_data, second_data)
-        f = NumericMemField(session, dtype_to_str(r.dtype))
-        f.data.write(r)
-        return f
+    @classmethod
+    def _output(cls, session, function, operands, spare):
+        """
+        Get an array that the result can be written into: an operand that may be overwritten
+        and already has the result's dtype and shape, or inside Session.fused_ops, a released
+        array from the session's pool. Returns None if there is neither.
+        """
+        pool = getattr(session, '_operation_buffers', None)
+        if not any(spare) and pool is None:
+            return None
+        layout = cls._result_layout(function, operands)
+        if layout is None:
+            return None
+        for data, is_spare in zip(operands, spare):
+            if is_spare and isinstance(data, np.ndarray) and data.flags.writeable and\
+                    (data.dtype, data.shape) == layout:
+                return data
+        return None if pool is None else pool.acquire(*layout)
 
     @staticmethod
-    def _unary_op(session, first, function):
-        if isinstance(first, Field):
-            first_data = first.data[:]
-        else:
-            first_data = first
-
-        r = function(first_data)
+    def _result_field(session, r):
+        # results are new arrays, spare operands or arrays that nothing else refers to, so the
+        # field takes them over rather than copying them
         f = NumericMemField(session, dtype_to_str(r.dtype))
-        f.data.write(r)
+        f.data.write_part(r, move_mem=True)
+        f.data.complete()
+        pool = getattr(session, '_operation_buffers', None)
+        if pool is not None:
+            pool.track(f)
         return f
 
     @classmethod
-    def numeric_add(cls, session, first, second):
-        def function_add(first, second):
-            return first + second
+    def _apply(cls, session, function, *operands):
+        data, spare = zip(*(cls._operand_data(o) for o in operands))
+        out = cls._output(session, function, data, spare)
+        r = function(*data, out=out)
+        return cls._result_field(session, r)
 
-        return cls._binary_op(session, first, second, function_add)
+    @classmethod
+    def _binary_op(cls, session, first, second, function):
+        return cls._apply(session, function, first, second)
 
     @classmethod
-    def numeric_sub(cls, session, first, second):
-        def function_sub(first, second):
-            return first - second
+    def _unary_op(cls, session, first, function):
+        return cls._apply(session, function, first)
 
-        return cls._binary_op(session, first, second, function_sub)
+    @classmethod
+    def numeric_add(cls, session, first, second):
+        return cls._binary_op(session, first, second, np.add)
 
     @classmethod
-    def numeric_mul(cls, session, first, second):
-        def function_mul(first, second):
-            return first * second
+    def numeric_sub(cls, session, first, second):
+        return cls._binary_op(session, first, second, np.subtract)
 
-        return cls._binary_op(session, first, second, function_mul)
+    @classmethod
+    def numeric_mul(cls, session, first, second):
+        return cls._binary_op(session, first, second, np.multiply)
 
     @classmethod
     def numeric_truediv(cls, session, first, second):
-        def function_truediv(first, second):
-            return first / second
-
-        return cls._binary_op(session, first, second, function_truediv)
+        return cls._binary_op(session, first, second, np.true_divide)
 
     @classmethod
     def numeric_floordiv(cls, session, first, second):
-        def function_floordiv(first, second):
-            return first // second
-
-        return cls._binary_op(session, first, second, function_floordiv)
+        return cls._binary_op(session, first, second, np.floor_divide)
 
     @classmethod
     def numeric_mod(cls, session, first, second):
-        def function_mod(first, second):
-            return first % second
-
-        return cls._binary_op(session, first, second, function_mod)
+        return cls._binary_op(session, first, second, np.remainder)
 
     @classmethod
     def numeric_divmod(cls, session, first, second):
-        if isinstance(first, Field):
-            first_data = first.data[:]
-        else:
-            first_data = first
-
-        if isinstance(second, Field):
-            second_data = second.data[:]
-        else:
-            second_data = second
+        first_data, _ = cls._operand_data(first)
+        second_data, _ = cls._operand_data(second)
 
         r1, r2 = np.divmod(first_data, second_data)
-        f1 = NumericMemField(session, dtype_to_str(r1.dtype))
-        f1.data.write(r1)
-        f2 = NumericMemField(session, dtype_to_str(r2.dtype))
-        f2.data.write(r2)
-        return f1, f2
+        return cls._result_field(session, r1), cls._result_field(session, r2)
 
     @classmethod
     def numeric_and(cls, session, first, second):
-        def function_and(first, second):
-            return first & second
-
-        return cls._binary_op(session, first, second, function_and)
+        return cls._binary_op(session, first, second, np.bitwise_and)
 
     @classmethod
     def numeric_xor(cls, session, first, second):
-        def function_xor(first, second):
-            return first ^ second
-
-        return cls._binary_op(session, first, second, function_xor)
+        return cls._binary_op(session, first, second, np.bitwise_xor)
 
     @classmethod
     def numeric_or(cls, session, first, second):
-        def function_or(first, second):
-            return first | second
-
-        return cls._binary_op(session, first, second, function_or)
+        return cls._binary_op(session, first, second, np.bitwise_or)
 
     @classmethod
     def invert(cls, session, first):
-        def function_invert(first):
-            return ~first
-
-        return cls._unary_op(session, first, function_invert)
+        return cls._unary_op(session, first, np.invert)
 
     @classmethod
     def logical_not(cls, session, first):
-        def function_logical_not(first):
-            return np.logical_not(first)
-
-        return cls._unary_op(session, first, function_logical_not)
+        return cls._unary_op(session, first, np.logical_not)
 
     @classmethod
     def less_than(cls, session, first, second):
-        def function_less_than(first, second):
-            return first < second
-
-        return cls._binary_op(session, first, second, function_less_than)
+        return cls._binary_op(session, first, second, np.less)
 
     @classmethod
     def less_than_equal(cls, session, first, second):
-        def function_less_than_equal(first, second):
-            return first <= second
-
-        return cls._binary_op(session, first, second, function_less_than_equal)
+        return cls._binary_op(session, first, second, np.less_equal)
 
     @classmethod
     def equal(cls, session, first, second):
-        def function_equal(first, second):
-            return first == second
-
-        return cls._binary_op(session, first, second, function_equal)
+        return cls._binary_op(session, first, second, np.equal)
 
     @classmethod
     def not_equal(cls, session, first, second):
-        def function_not_equal(first, second):
-            return first != second
-
-        return cls._binary_op(session, first, second, function_not_equal)
+        return cls._binary_op(session, first, second, np.not_equal)
 
     @classmethod
     def greater_than(cls, session, first, second):
-        def function_greater_than(first, second):
-            return first > second
-
-        return cls._binary_op(session, first, second, function_greater_than)
+        return cls._binary_op(session, first, second, np.greater)
 
     @classmethod
     def greater_than_equal(cls, session, first, second):
-        def function_greater_than_equal(first, second):
-            return first >= second
+        return cls._binary_op(session, first, second, np.greater_equal)
 
-        return cls._binary_op(session, first, second, function_greater_than_equal)
+    @staticmethod
+    def append_suffix_to_indexed_field(source, suffix):
+        if not source._write_enabled:
+            raise ValueError("This field is marked read-only. Call writeable() on it before "
+                             "appending to its entries")
+        if isinstance(suffix, str):
+            suffix = suffix.encode()
+
+        dest_indices, dest_values = \
+            ops.append_suffix_to_index_values(suffix, source.indices[:], source.values[:])
+
+        source.indices.clear()
+        source.indices.write(dest_indices)
+        source.values.clear()
+        source.values.write(dest_values)
+        # the data wrapper caches pages of the index, which no longer hold
+        source._data_wrapper = None
+        return source
 
     @staticmethod
     def apply_filter_to_indexed_field(source, filter_to_apply, target=None, in_place=False):
@@ -2412,6 +2872,11 @@ class FieldDataOps:
 
         filter_to_apply_ = val.array_from_field_or_lower('filter_to_apply', filter_to_apply)
 
+        if not in_place and target is not source and isinstance(source, HDF5Field) and\
+                filter_to_apply_.dtype == bool and\
+                len(filter_to_apply_) == len(source.data) > FILTER_STREAM_LENGTH:
+            return FieldDataOps._stream_filter_to_field(source, filter_to_apply_, target)
+
         dest_data = source.data[:][filter_to_apply_]
 
         if in_place:
@@ -2434,6 +2899,61 @@ class FieldDataOps:
             mem_field.data.write(dest_data)
             return mem_field
 
+    @staticmethod
+    def _stream_filter_to_field(source, filter_to_apply, target):
+        # the source is read and filtered a window at a time, so that neither it nor a second
+        # copy of the filtered data is held in memory while writing to an hdf5 target
+        window = FILTER_STREAM_LENGTH
+        parts = (source.data[i:i + window][filter_to_apply[i:i + window]]
+                 for i in range(0, len(filter_to_apply), window))
+        if not isinstance(target, HDF5Field):
+            dest_data = np.concatenate(list(parts))
+            if target is None:
+                target = source.create_like()
+                target.data.write(dest_data)
+            elif len(target.data) == len(dest_data):
+                target.data[:] = dest_data
+            else:
+                target.data.clear()
+                target.data.write(dest_data)
+            return target
+
+        if len(target.data) == np.count_nonzero(filter_to_apply):
+            start = 0
+            for part in parts:
+                target.data[start:start + len(part)] = part
+                start += len(part)
+        else:
+            target.data.clear()
+            for part in parts:
+                target.data.write_part(part)
+            target.data.complete()
+        return target
+
+    @staticmethod
+    def _read_index_runs(dataset, index):
+        """
+        Read the entries of dataset that index selects straight into the result, a run of
+        consecutive entries at a time, rather than reading the whole dataset and then indexing
+        it. This is only done when the runs are long enough for the reads to be worthwhile;
+        otherwise None is returned.
+        """
+        # reading runs only pays off when they cover a small part of the dataset, as they can
+        # otherwise read the chunks that runs share more than once
+        if not INDEX_RUN_READ_MIN_LENGTH <= len(index) <= len(dataset) // 4 or\
+                index.dtype.kind not in 'iu' or dataset.dtype.kind == 'O':
+            return None
+        starts, stops = ops.coalesce_index_to_slices(index)
+        if len(starts) * INDEX_RUN_READ_MIN_LENGTH > len(index) or\
+                starts.min() < 0 or stops.max() > len(dataset):
+            return None
+        result = np.empty(len(index), dtype=dataset.dtype)
+        offset = 0
+        for start, stop in zip(starts.tolist(), stops.tolist()):
+            dataset.read_direct(result, np.s_[start:stop], np.s_[offset:offset + stop - start])
+            offset += stop - start
+        return result
+
     @staticmethod
     def apply_index_to_field(source, index_to_apply, target=None, in_place=False):
         if in_place is True and target is not None:
@@ -2441,7 +2961,11 @@ class FieldDataOps:
 
         index_to_apply_ = val.array_from_field_or_lower('index_to_apply', index_to_apply)
 
-        dest_data = source.data[:][index_to_apply_]
+        dest_data = None
+        if isinstance(source, HDF5Field):
+            dest_data = FieldDataOps._read_index_runs(source.data._dataset, index_to_apply_)
+        if dest_data is None:
+            dest_data = source.data[:][index_to_apply_]
 
         if in_place:
             if not source._write_enabled:
@@ -13,6 +13,7 @@ import os
 import csv
 from datetime import datetime, MAXYEAR
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import numpy as np
 import h5py
@@ -120,6 +121,17 @@ def import_with_schema(timestamp, dest_file_name, schema_file, files, overwrite,
         print(hf.keys())
 
 
+def _write_parts(executor, writers, chunks, count):
+    # each writer has its own datasets, so the parts can be converted and written concurrently;
+    # the chunks are refilled by the row loop, so every write must finish before returning
+    futures = list()
+    for writer, chunk in zip(writers, chunks):
+        futures.append(executor.submit(writer.write_part,
+                                       chunk if count == len(chunk) else chunk[:count]))
+    for f in futures:
+        f.result()
+
+
 class DatasetImporter:
     def __init__(self, datastore, source, hf, space, schema, timestamp,
                  include=None, exclude=None,
@@ -141,7 +153,10 @@ class DatasetImporter:
             csvf = csv.DictReader(sf, delimiter=',', quotechar='"')
             # self.names_ = csvf.fieldnames
 
-            available_keys = [k.strip() for k in csvf.fieldnames if k.strip() in schema.fields]
+            # 'fields' is a deep copy of the schema's field descriptions, categorical maps
+            # included, so it is taken once rather than for every column
+            schema_fields = schema.fields
+            available_keys = [k.strip() for k in csvf.fieldnames if k.strip() in schema_fields]
             if space in include and len(include[space]) > 0:
                 available_keys = include[space]
             if space in exclude and len(exclude[space]) > 0:
@@ -178,7 +193,7 @@ class DatasetImporter:
             # TODO: categorical writers should use the datatype specified in the schema
             for i_n in range(len(fields_to_use)):
                 field_name = fields_to_use[i_n]
-                sch = schema.fields[field_name]
+                sch = schema_fields[field_name]
                 writer = sch.importer(datastore, group, field_name, timestamp)
                 # TODO: this list is required because we convert the categorical values to
                 # numerical values ahead of adding them. We could use importers that handle
@@ -189,50 +204,54 @@ class DatasetImporter:
                 new_field_list.append(writer)
                 field_chunk_list.append(writer.chunk_factory(chunk_size))
 
+            # everything the row loop needs for each column, built once rather than being
+            # looked up from parallel lists for every field of every row
+            columns = list(zip(index_map, field_chunk_list, categorical_map_list))
+
             csvf = csv.reader(sf, delimiter=',', quotechar='"')
             ecsvf = iter(csvf)
 
-            chunk_index = 0
-            try:
-                for i_r, row in enumerate(ecsvf):
-                    if show_progress_every:
-                        if i_r % show_progress_every == 0:
-                            print(f"{i_r} rows parsed in {time.time() - time0}s")
-
-                    if early_filter is not None:
-                        if not early_filter[1](row[early_key_index]):
-                            continue
-
-                    if i_r == stop_after:
-                        break
-
-                    if not filter_fn or filter_fn(i_r):
-                        for i_df, i_f in enumerate(index_map):
-                            f = row[i_f]
-                            categorical_map = categorical_map_list[i_df]
-                            if categorical_map is not None:
-                                if f not in categorical_map:
-                                    error = "'{}' not valid: must be one of {} for field '{}'"
-                                    raise KeyError(
-                                        error.format(f, categorical_map, available_keys[i_f]))
-                                f = categorical_map[f]
-                            field_chunk_list[i_df][chunk_index] = f
-                        chunk_index += 1
-                        if chunk_index == chunk_size:
-                            for i_df in range(len(index_map)):
-                                # with utils.Timer("writing to {}".format(self.names_[i_df])):
-                                #     new_field_list[i_df].write_part(field_chunk_list[i_df])
-                                new_field_list[i_df].write_part(field_chunk_list[i_df])
-                            chunk_index = 0
-
-            except Exception as e:
-                msg = "row {}: caught exception {}\nprevious row {}"
-                print(msg.format(i_r + 1, e, row))
-                raise
-
-            if chunk_index != 0:
-                for i_df in range(len(index_map)):
-                    new_field_list[i_df].write_part(field_chunk_list[i_df][:chunk_index])
+            # the writers are independent and do most of their conversion in numpy and numba, which
+            # release the gil, so each chunk is written to them concurrently
+            max_workers = min(len(new_field_list), os.cpu_count() or 1)
+            with ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+                chunk_index = 0
+                try:
+                    for i_r, row in enumerate(ecsvf):
+                        if show_progress_every:
+                            if i_r % show_progress_every == 0:
+                                print(f"{i_r} rows parsed in {time.time() - time0}s")
+
+                        if early_filter is not None:
+                            if not early_filter[1](row[early_key_index]):
+                                continue
+
+                        if i_r == stop_after:
+                            break
+
+                        if not filter_fn or filter_fn(i_r):
+                            for i_f, field_chunk, categorical_map in columns:
+                                f = row[i_f]
+                                if categorical_map is not None:
+                                    if f not in categorical_map:
+                                        error = "'{}' not valid: must be one of {} for field '{}'"
+                                        raise KeyError(
+                                            error.format(f, categorical_map, available_keys[i_f]))
+                                    f = categorical_map[f]
+                                field_chunk[chunk_index] = f
+                            chunk_index += 1
+                            if chunk_index == chunk_size:
+                                _write_parts(executor, new_field_list, field_chunk_list,
+                                             chunk_index)
+                                chunk_index = 0
+
+                except Exception as e:
+                    msg = "row {}: caught exception {}\nprevious row {}"
+                    print(msg.format(i_r + 1, e, row))
+                    raise
+
+                if chunk_index != 0:
+                    _write_parts(executor, new_field_list, field_chunk_list, chunk_index)
 
             for i_df in range(len(index_map)):
                 new_field_list[i_df].flush()
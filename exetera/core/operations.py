@@ -1,5 +1,6 @@
 from datetime import datetime
 import numpy as np
+import pandas as pd
 from numba import jit, njit
 import numba
 from numba.typed import List
@@ -12,6 +13,10 @@ DEFAULT_CHUNKSIZE = 1 << 20
 INVALID_INDEX = 1 << 62
 MAX_DATETIME = datetime(year=3000, month=1, day=1) #.timestamp()
 
+# the csv separator and delimiter as the uint8 values that indexed string buffers hold
+CSV_SEPARATOR = np.uint8(ord(','))
+CSV_DELIMITER = np.uint8(ord('"'))
+
 
 def chunks(length, chunksize=1 << 20):
     cur = 0
@@ -32,43 +37,45 @@ def safe_map(field, map_field, map_filter, empty_value=None):
         return safe_map_values(field, map_field, map_filter, empty_value)
 
 
-@njit
-def safe_map_indexed_values(data_indices, data_values, map_field, map_filter, empty_value=None):
-    empty_value_len = 0 if empty_value is None else len(empty_value)
-    value_length = 0
-    for i in range(len(map_field)):
+@njit(parallel=True)
+def _safe_map_indexed_values_parallel(data_indices, data_values, map_field, map_filter,
+                                      empty_value_len):
+    lengths = np.zeros(len(map_field), dtype=np.int64)
+    for i in numba.prange(len(map_field)):
         if map_filter[i]:
-            value_length += data_indices[map_field[i]+1] - data_indices[map_field[i]]
+            lengths[i] = data_indices[map_field[i]+1] - data_indices[map_field[i]]
         else:
-            value_length += empty_value_len
+            lengths[i] = empty_value_len
 
     i_result = np.zeros(len(map_field) + 1, dtype=data_indices.dtype)
-    v_result = np.zeros(value_length, dtype=data_values.dtype)
+    i_result[1:] = np.cumsum(lengths)
+    # filtered rows are filled by the caller, so the values needn't be zeroed here
+    v_result = np.empty(i_result[-1], dtype=data_values.dtype)
 
-    offset = 0
-    i_result[0] = 0
-    for i in range(len(map_field)):
+    # each output row has its own destination range, so the copies are independent
+    for i in numba.prange(len(map_field)):
         if map_filter[i]:
             sst = data_indices[map_field[i]]
-            sse = data_indices[map_field[i]+1]
-            dst = offset
-            delta = sse - sst
-            dse = offset + delta
-            i_result[i+1] = dse
-            v_result[dst:dse] = data_values[sst:sse]
-            offset += delta
-        else:
-            dst = offset
-            dse = offset + empty_value_len
-            i_result[i+1] = dse
-            if empty_value is not None:
-                v_result[dst:dse] = empty_value
-            offset += dse - dst
+            v_result[i_result[i]:i_result[i+1]] = data_values[sst:sst + lengths[i]]
 
     return i_result, v_result
 
 
 @njit
+def safe_map_indexed_values(data_indices, data_values, map_field, map_filter, empty_value=None):
+    empty_value_len = 0 if empty_value is None else len(empty_value)
+    i_result, v_result = _safe_map_indexed_values_parallel(
+        data_indices, data_values, map_field, map_filter, empty_value_len)
+
+    if empty_value is not None:
+        for i in range(len(map_field)):
+            if not map_filter[i]:
+                v_result[i_result[i]:i_result[i+1]] = empty_value
+
+    return i_result, v_result
+
+
+@njit(nogil=True)
 def safe_map_values(data_field, map_field, map_filter, empty_value=None):
     result = np.zeros_like(map_field, dtype=data_field.dtype)
     empty_val = result[0] if empty_value is None else empty_value
@@ -80,6 +87,53 @@ def safe_map_values(data_field, map_field, map_filter, empty_value=None):
     return result
 
 
+def map_values_no_mask(data_field, map_field):
+    """
+    Map the values of data_field through map_field, where every entry of map_field is known to be
+    valid. This is the unfiltered counterpart to safe_map_values.
+    """
+    return np.take(data_field, map_field)
+
+
+@njit(parallel=True)
+def map_indexed_values_no_mask(data_indices, data_values, map_field):
+    """
+    Map the entries of an indexed field through map_field, where every entry of map_field is known
+    to be valid. This is the unfiltered counterpart to safe_map_indexed_values.
+    """
+    lengths = np.empty(len(map_field), dtype=np.int64)
+    for i in numba.prange(len(map_field)):
+        lengths[i] = data_indices[map_field[i]+1] - data_indices[map_field[i]]
+
+    i_result = np.zeros(len(map_field) + 1, dtype=data_indices.dtype)
+    i_result[1:] = np.cumsum(lengths)
+    # every output row is copied below, so the values needn't be zeroed
+    v_result = np.empty(i_result[-1], dtype=data_values.dtype)
+
+    # each output row has its own destination range, so the copies are independent
+    for i in numba.prange(len(map_field)):
+        sst = data_indices[map_field[i]]
+        v_result[i_result[i]:i_result[i+1]] = data_values[sst:sst + lengths[i]]
+
+    return i_result, v_result
+
+
+def indexed_values_to_strings(index, values):
+    """
+    Decode the entries of an indexed string field into a list of strings, where values holds
+    the bytes from index[0] to index[-1]. The bytes are copied out of the array once; if they
+    are all ascii, they are decoded once and the strings are sliced from the text.
+    """
+    buf = np.asarray(values).tobytes()
+    offsets = (np.asarray(index) - index[0]).tolist()
+    text = buf.decode()
+    source = text if len(text) == len(buf) else buf
+    results = [source[offsets[i]:offsets[i+1]] for i in range(len(offsets) - 1)]
+    if source is buf:
+        results = [r.decode() for r in results]
+    return results
+
+
 @njit
 def map_valid(data_field, map_field, result=None):
     if result is None:
@@ -90,6 +144,251 @@ def map_valid(data_field, map_field, result=None):
     return result
 
 
+# fixed string keys up to this many bytes wide are factorized as machine words
+MAX_FIXED_STRING_WORDS_WIDTH = 32
+
+
+def _fixed_string_words(data):
+    """
+    Reinterpret a fixed string ('S') array as a list of unsigned integer arrays, one per machine
+    word of its width, so that it can be hashed as numbers rather than as python bytes objects.
+    Widths of 1, 2, 4 and 8 bytes are a single view; other widths are zero padded to a multiple
+    of 8 bytes, which doesn't change which values are equal, as numpy pads fixed strings with
+    zero bytes itself.
+    """
+    width = data.dtype.itemsize
+    data = np.ascontiguousarray(data)
+    if width in (1, 2, 4, 8):
+        return [data.view('u{}'.format(width))]
+    padded = np.zeros((len(data), -(-width // 8) * 8), dtype=np.uint8)
+    padded[:, :width] = data.view(np.uint8).reshape(-1, width)
+    words = padded.view(np.uint64)
+    return [np.ascontiguousarray(words[:, i]) for i in range(words.shape[1])]
+
+
+def _factorize_key(left_key, right_key):
+    """
+    Assign integer codes to the distinct values of a pair of key arrays. Codes are shared between
+    the left and the right keys and are allocated in order of first appearance, first in the left
+    key and then in the right key. The codes are int32 whenever the number of distinct values
+    allows it, so that the join itself runs over narrower data than wide (e.g. int64 id) keys.
+    """
+    combined = np.concatenate((np.asarray(left_key), np.asarray(right_key)))
+    if combined.dtype.kind == 'S' and combined.dtype.itemsize <= MAX_FIXED_STRING_WORDS_WIDTH:
+        words = _fixed_string_words(combined)
+        if len(words) > 1:
+            # wider strings are factorized as a compound key of their words
+            return _factorize_keys(tuple(w[:len(left_key)] for w in words),
+                                   tuple(w[len(left_key):] for w in words))
+        combined = words[0]
+    # factorize hashes rather than sorts, and allocates codes in order of first appearance
+    codes, uniques = pd.factorize(combined)
+    count = len(uniques)
+    missing = codes == -1
+    if missing.any():
+        # nan keys are given a code of their own so that they match each other, as in pandas,
+        # ranked by where the first nan appears
+        first = np.argmax(missing)
+        nan_code = codes[:first].max() + 1 if first > 0 else 0
+        codes[codes >= nan_code] += 1
+        codes[missing] = nan_code
+        count += 1
+    if count < (1 << 31):
+        codes = codes.astype(np.int32)
+    return codes[:len(left_key)], codes[len(left_key):], count
+
+
+def _factorize_keys(left_keys, right_keys):
+    if not isinstance(left_keys, tuple):
+        return _factorize_key(left_keys, right_keys)
+
+    l_codes, r_codes, count = _factorize_key(left_keys[0], right_keys[0])
+    for lk, rk in zip(left_keys[1:], right_keys[1:]):
+        l_next, r_next, next_count = _factorize_key(lk, rk)
+        # combine the codes of the keys so far with those of the next key and compact them again
+        l_codes, r_codes, count = _factorize_key(l_codes.astype(np.int64) * next_count + l_next,
+                                                 r_codes.astype(np.int64) * next_count + r_next)
+    return l_codes, r_codes, count
+
+
+def _key_code_ranks(left_keys, right_keys, l_codes, r_codes, count):
+    """
+    Rank the codes of a pair of factorized keys by the key values that they stand for, with nan
+    last, so that join groups can be emitted in key order. Compound keys are ranked
+    lexicographically.
+    """
+    codes = np.concatenate((l_codes, r_codes))
+    # any row with a given code can stand for its key value
+    rows = np.zeros(count, dtype=np.int64)
+    rows[codes] = np.arange(len(codes))
+    if isinstance(left_keys, tuple):
+        values = [np.concatenate((np.asarray(lk), np.asarray(rk)))[rows]
+                  for lk, rk in zip(left_keys, right_keys)]
+        order = np.lexsort(values[::-1])
+    else:
+        values = np.concatenate((np.asarray(left_keys), np.asarray(right_keys)))[rows]
+        order = np.argsort(values, kind='stable')
+    ranks = np.zeros(count, dtype=codes.dtype)
+    ranks[order] = np.arange(count, dtype=codes.dtype)
+    return ranks
+
+
+def _expand_join_rows(rows, row_codes, other_counts, other_order, other_starts,
+                      keep_unmatched, index_dtype):
+    # each row is emitted once per matching row on the other side, or once with an invalid
+    # mapping if it has no matches and unmatched rows are being kept
+    matches = other_counts[row_codes]
+    emitted = np.maximum(matches, 1) if keep_unmatched else matches
+    total = np.sum(emitted)
+    offsets = np.cumsum(emitted) - emitted
+    row_map = np.repeat(rows, emitted).astype(index_dtype)
+    other_filt = np.repeat(matches > 0, emitted)
+    within = np.arange(total) - np.repeat(offsets, emitted)
+    other_map = np.zeros(total, dtype=index_dtype)
+    other_map[other_filt] =\
+        other_order[(np.repeat(other_starts[row_codes], emitted) + within)[other_filt]]
+    return row_map, other_map, other_filt
+
+
+def _is_sorted_unique(keys):
+    keys = np.asarray(keys)
+    return np.issubdtype(keys.dtype, np.number) and bool(np.all(keys[1:] > keys[:-1]))
+
+
+def _generate_sorted_unique_merge_maps(left_keys, right_keys, how, index_dtype):
+    """
+    Generate the merge maps for a pair of strictly increasing keys by walking both keys with the
+    ordered merge kernels. Both keys being sorted means that every join mode can emit its rows in
+    key order.
+    """
+    if how == 'inner':
+        size = ordered_inner_map_result_size(left_keys, right_keys)
+        l_map = np.zeros(size, dtype=index_dtype)
+        r_map = np.zeros(size, dtype=index_dtype)
+        ordered_inner_map_both_unique(left_keys, right_keys, l_map, r_map)
+        return l_map, np.ones(size, dtype=bool), r_map, np.ones(size, dtype=bool)
+
+    if how == 'right':
+        r_map, r_filt, l_map, l_filt =\
+            _generate_sorted_unique_merge_maps(right_keys, left_keys, 'left', index_dtype)
+        return l_map, l_filt, r_map, r_filt
+
+    if how == 'outer':
+        size = ordered_outer_map_result_size_both_unique(left_keys, right_keys)
+        l_map = np.zeros(size, dtype=index_dtype)
+        l_filt = np.zeros(size, dtype=bool)
+        r_map = np.zeros(size, dtype=index_dtype)
+        r_filt = np.zeros(size, dtype=bool)
+        ordered_outer_map_both_unique(left_keys, right_keys, l_map, l_filt, r_map, r_filt)
+        return l_map, l_filt, r_map, r_filt
+
+    other_to_unique = np.zeros(len(left_keys), dtype=np.int64)
+    ordered_map_to_right_both_unique(left_keys, right_keys, other_to_unique)
+    r_filt = other_to_unique != INVALID_INDEX
+    r_map = np.where(r_filt, other_to_unique, 0).astype(index_dtype)
+    l_map = np.arange(len(left_keys), dtype=index_dtype)
+    l_filt = np.ones(len(l_map), dtype=bool)
+    return l_map, l_filt, r_map, r_filt
+
+
+def generate_merge_maps(left_keys, right_keys, how, index_dtype=np.int64):
+    """
+    Generate the maps from the left and right key rows to the rows of a database-style join of
+    the keys, along with filters indicating which destination rows are mapped from each side.
+
+    Destination rows are emitted in the order that pandas.merge with sort=False documents (and
+    follows as of pandas 2.2):
+     * 'left' / 'right': the rows of that side in order, each repeated once per matching row of
+       the other side (in that side's row order), or emitted once, unmapped, if it has no match
+     * 'inner': as 'left', without the left rows that have no match
+     * 'outer': grouped by key value, in sorted order with nan last; within a group, the left rows
+       in order, each paired with the matching right rows in order, or the right rows in order if
+       the group has no left rows
+     * 'cross': each left row in order, paired with every right row in order
+
+    :param left_keys: The left key, either a numpy array or a tuple of numpy arrays for compound
+        keys
+    :param right_keys: The right key, either a numpy array or a tuple of numpy arrays for compound
+        keys
+    :param how: The join mode, one of 'left', 'right', 'inner', 'outer' or 'cross'
+    :param index_dtype: The dtype of the generated maps
+    :return: A tuple of (left_to_dest_map, left_to_dest_filter, right_to_dest_map,
+        right_to_dest_filter)
+    """
+    left_len = len(left_keys[0]) if isinstance(left_keys, tuple) else len(left_keys)
+    right_len = len(right_keys[0]) if isinstance(right_keys, tuple) else len(right_keys)
+
+    if how == 'cross':
+        l_map = np.repeat(np.arange(left_len, dtype=index_dtype), right_len)
+        r_map = np.tile(np.arange(right_len, dtype=index_dtype), left_len)
+        return l_map, np.ones(len(l_map), dtype=bool), r_map, np.ones(len(r_map), dtype=bool)
+
+    if not isinstance(left_keys, tuple) and\
+            _is_sorted_unique(left_keys) and _is_sorted_unique(right_keys):
+        return _generate_sorted_unique_merge_maps(left_keys, right_keys, how, index_dtype)
+
+    if how in ('left', 'right') and not isinstance(left_keys, tuple):
+        # when the key being joined to is unique, each row of the other key maps to at most one
+        # row and the maps can be read directly from a hash index of the unique key
+        if how == 'left':
+            unique_keys, other_keys = right_keys, left_keys
+        else:
+            unique_keys, other_keys = left_keys, right_keys
+        unique_index = pd.Index(unique_keys)
+        if unique_index.is_unique:
+            other_to_unique = unique_index.get_indexer(other_keys)
+            unique_filt = other_to_unique != -1
+            unique_map = np.where(unique_filt, other_to_unique, 0).astype(index_dtype)
+            other_map = np.arange(len(other_to_unique), dtype=index_dtype)
+            other_filt = np.ones(len(other_map), dtype=bool)
+            if how == 'left':
+                return other_map, other_filt, unique_map, unique_filt
+            return unique_map, unique_filt, other_map, other_filt
+
+    l_codes, r_codes, count = _factorize_keys(left_keys, right_keys)
+    if how == 'outer':
+        # outer joins emit their key groups in key order
+        ranks = _key_code_ranks(left_keys, right_keys, l_codes, r_codes, count)
+        l_codes = ranks[l_codes]
+        r_codes = ranks[r_codes]
+
+    l_counts = np.bincount(l_codes, minlength=count)
+    l_order = np.argsort(l_codes, kind='stable')
+    l_starts = np.cumsum(l_counts) - l_counts
+    r_counts = np.bincount(r_codes, minlength=count)
+    r_order = np.argsort(r_codes, kind='stable')
+    r_starts = np.cumsum(r_counts) - r_counts
+
+    if how == 'left':
+        l_map, r_map, r_filt = _expand_join_rows(np.arange(left_len), l_codes,
+                                                 r_counts, r_order, r_starts, True, index_dtype)
+        return l_map, np.ones(len(l_map), dtype=bool), r_map, r_filt
+
+    if how == 'right':
+        r_map, l_map, l_filt = _expand_join_rows(np.arange(right_len), r_codes,
+                                                 l_counts, l_order, l_starts, True, index_dtype)
+        return l_map, l_filt, r_map, np.ones(len(r_map), dtype=bool)
+
+    if how == 'inner':
+        # inner joins keep the left rows in order, dropping those without a match
+        l_map, r_map, r_filt = _expand_join_rows(np.arange(left_len), l_codes,
+                                                 r_counts, r_order, r_starts, False, index_dtype)
+        return l_map, np.ones(len(l_map), dtype=bool), r_map, r_filt
+
+    # the left rows are expanded grouped by key, and the right rows without a left match are then
+    # merged in among those groups by key
+    l_map, r_map, r_filt = _expand_join_rows(l_order, l_codes[l_order],
+                                             r_counts, r_order, r_starts, True, index_dtype)
+    r_only = r_order[l_counts[r_codes[r_order]] == 0].astype(index_dtype)
+    order = np.argsort(np.concatenate((l_codes[l_map], r_codes[r_only])), kind='stable')
+    l_map = np.concatenate((l_map, np.zeros(len(r_only), dtype=index_dtype)))[order]
+    l_filt = np.concatenate((np.ones(len(r_map), dtype=bool),
+                             np.zeros(len(r_only), dtype=bool)))[order]
+    r_map = np.concatenate((r_map, r_only))[order]
+    r_filt = np.concatenate((r_filt, np.ones(len(r_only), dtype=bool)))[order]
+    return l_map, l_filt, r_map, r_filt
+
+
 def ordered_map_valid_stream(data_field, map_field, result_field, chunksize=DEFAULT_CHUNKSIZE):
     df_it = iter(chunks(len(data_field.data), chunksize=chunksize))
     mf_it = iter(chunks(len(map_field.data), chunksize=chunksize))
@@ -154,58 +453,68 @@ def data_iterator(data_field, chunksize=1 << 20):
 
 @njit
 def apply_filter_to_index_values(index_filter, indices, values):
-    # pass 1 - determine the destination lengths
-    cur_ = indices[:-1]
-    next_ = indices[1:]
-    count = 0
-    total = 0
-    for i in range(len(index_filter)):
-        if index_filter[i] == True:
-            count += 1
-            total += next_[i] - cur_[i]
-    dest_indices = np.zeros(count+1, indices.dtype)
-    dest_values = np.zeros(total, values.dtype)
-    dest_indices[0] = 0
-    count = 1
-    total = 0
-    for i in range(len(index_filter)):
-        if index_filter[i] == True:
-            n = next_[i]
-            c = cur_[i]
-            delta = n - c
-            dest_values[total:total + delta] = values[c:n]
-            total += delta
-            dest_indices[count] = total
-            count += 1
+    return _apply_indices_to_index_values_parallel(np.flatnonzero(index_filter == True),
+                                                   indices, values)
+
+
+def append_suffix_to_index_values(suffix, indices, values):
+    """
+    Append the bytes of suffix to every entry of an indexed string, given as its indices and
+    values, returning the indices and values of the result. Each entry's bytes move along by
+    the length of the suffixes before it, so the bytes are copied in two bulk assignments
+    rather than entry by entry.
+    """
+    suffix = np.frombuffer(suffix, dtype=values.dtype)
+    count = max(len(indices) - 1, 0)
+    dest_indices = indices + len(suffix) * np.arange(len(indices), dtype=indices.dtype)
+    dest_values = np.empty(len(values) + len(suffix) * count, dtype=values.dtype)
+    suffix_positions =\
+        (dest_indices[1:, np.newaxis] - len(suffix) + np.arange(len(suffix))).ravel()
+    is_value = np.ones(len(dest_values), dtype=bool)
+    is_value[suffix_positions] = False
+    dest_values[is_value] = values
+    dest_values[suffix_positions] = np.tile(suffix, count)
     return dest_indices, dest_values
 
 
 @njit
 def apply_indices_to_index_values(indices_to_apply, indices, values):
-    # pass 1 - determine the destination lengths
+    return _apply_indices_to_index_values_parallel(indices_to_apply, indices, values)
+
+
+@njit(parallel=True)
+def _apply_indices_to_index_values_parallel(indices_to_apply, indices, values):
     cur_ = indices[:-1]
     next_ = indices[1:]
-    count = 0
-    total = 0
-    for i in indices_to_apply:
-        count += 1
-        total += next_[i] - cur_[i]
-    dest_indices = np.zeros(count+1, indices.dtype)
-    dest_values = np.zeros(total, values.dtype)
-    dest_indices[0] = 0
-    count = 1
-    total = 0
-    for i in indices_to_apply:
-        n = next_[i]
-        c = cur_[i]
-        delta = n - c
-        dest_values[total:total + delta] = values[c:n]
-        total += delta
-        dest_indices[count] = total
-        count += 1
+    # pass 1 - determine the destination lengths
+    lengths = np.empty(len(indices_to_apply), dtype=np.int64)
+    for i in numba.prange(len(indices_to_apply)):
+        lengths[i] = next_[indices_to_apply[i]] - cur_[indices_to_apply[i]]
+    dest_indices = np.zeros(len(indices_to_apply) + 1, indices.dtype)
+    dest_indices[1:] = np.cumsum(lengths)
+    # every destination byte is copied in pass 2, so the values needn't be zeroed
+    dest_values = np.empty(dest_indices[-1], values.dtype)
+
+    # pass 2 - each entry has its own destination range, so the copies are independent
+    for i in numba.prange(len(indices_to_apply)):
+        c = cur_[indices_to_apply[i]]
+        dest_values[dest_indices[i]:dest_indices[i + 1]] = values[c:c + lengths[i]]
     return dest_indices, dest_values
 
 
+def coalesce_index_to_slices(index):
+    """
+    Split index into runs of consecutive ascending entries, returning the start and stop of
+    each run, so that the entries index selects can be read as a list of slices.
+    """
+    index = np.asarray(index, dtype=np.int64)
+    run_starts = np.flatnonzero(np.diff(index) != 1) + 1
+    run_starts = np.concatenate(([0], run_starts))
+    run_stops = np.concatenate((run_starts[1:], [len(index)]))
+    starts = index[run_starts]
+    return starts, starts + (run_stops - run_starts)
+
+
 def get_spans_for_field(ndarray):
     results = np.zeros(len(ndarray) + 1, dtype=bool)
     if np.issubdtype(ndarray.dtype, np.number):
@@ -257,11 +566,16 @@ def _get_spans_for_index_string_field(indices,values):
         last = indices[i - 1]
         current = indices[i]
         next = indices[i + 1]
-        if next - current != current - last:  # compare size first
+        length = current - last
+        if next - current != length:  # compare size first
             result.append(i)
             continue
-        if not np.array_equal(values[last:current], values[current:next]):
-            result.append(i)
+        # compare the bytes in place, stopping at the first difference, rather than with
+        # np.array_equal, which builds and checks a comparison of the whole slices for each pair
+        for j in range(length):
+            if values[last + j] != values[current + j]:
+                result.append(i)
+                break
     result.append(len(indices) - 1)  # total number of elements
     return result
 
@@ -506,8 +820,8 @@ def apply_spans_min(spans, src_array, dest_array):
 @njit
 def apply_spans_concat(spans, src_index, src_values, dest_index, dest_values,
                        max_index_i, max_value_i, s_start):
-    separator = np.frombuffer(b',', dtype=np.uint8)[0]
-    delimiter = np.frombuffer(b'"', dtype=np.uint8)[0]
+    separator = CSV_SEPARATOR
+    delimiter = CSV_DELIMITER
     if s_start == 0:
         index_i = np.uint32(1)
         index_v = np.int64(0)
@@ -844,6 +1158,41 @@ def ordered_inner_map_both_unique(left, right, left_to_inner, right_to_inner):
             j += 1
 
 
+@njit
+def ordered_outer_map_both_unique(left, right, left_to_outer, left_filt,
+                                  right_to_outer, right_filt):
+    i = 0
+    j = 0
+    cur_m = 0
+    while i < len(left) and j < len(right):
+        if left[i] < right[j]:
+            left_to_outer[cur_m] = i
+            left_filt[cur_m] = True
+            i += 1
+        elif left[i] > right[j]:
+            right_to_outer[cur_m] = j
+            right_filt[cur_m] = True
+            j += 1
+        else:
+            left_to_outer[cur_m] = i
+            left_filt[cur_m] = True
+            right_to_outer[cur_m] = j
+            right_filt[cur_m] = True
+            i += 1
+            j += 1
+        cur_m += 1
+    while i < len(left):
+        left_to_outer[cur_m] = i
+        left_filt[cur_m] = True
+        i += 1
+        cur_m += 1
+    while j < len(right):
+        right_to_outer[cur_m] = j
+        right_filt[cur_m] = True
+        j += 1
+        cur_m += 1
+
+
 def ordered_inner_map_left_unique_streamed(left, right, left_to_inner, right_to_inner,
                                            chunksize=1 << 20):
     i = 0
@@ -121,6 +121,12 @@ def try_str_to_float(value, invalid=0):
         return False, invalid
 
 
+# the conversion that each of these parsers attempts, so that importers can convert whole parts
+# with utils.convert_all_numbers instead of calling the parser for every value
+try_str_to_int.converter = int
+try_str_to_float.converter = float
+
+
 def _apply_filter_to_array(values, filter):
     return values[filter]
 
@@ -1,10 +1,10 @@
-from datetime import datetime
-
 import h5py
 
 import numpy as np
 
+from exetera.core import operations as ops
 from exetera.core import persistence as pers
+from exetera.core import utils
 from exetera.core.data_writer import DataWriter
 
 
@@ -35,13 +35,7 @@ class IndexedStringReader(Reader):
                 # TODO: validate slice
                 index = self.field['index'][start:stop + 1]
                 bytestr = self.field['values'][index[0]:index[-1]]
-                results = [None] * (len(index) - 1)
-                startindex = start
-                for ir in range(len(results)):
-                    results[ir] = \
-                        bytestr[index[ir] - np.int64(startindex):
-                                index[ir + 1] - np.int64(startindex)].tobytes().decode()
-                return results
+                return ops.indexed_values_to_strings(index, bytestr)
         except Exception as e:
             print("{}: unexpected exception {}".format(self.field.name, e))
             raise
@@ -227,8 +221,8 @@ class IndexedStringWriter(Writer):
         self.timestamp = timestamp
         self.datastore = datastore
 
-        self.values = np.zeros(self.datastore.chunksize, dtype=np.uint8)
-        self.indices = np.zeros(self.datastore.chunksize, dtype=np.int64)
+        self.values = np.empty(self.datastore.chunksize, dtype=np.uint8)
+        self.indices = np.empty(self.datastore.chunksize, dtype=np.int64)
         self.ever_written = False
         self.accumulated = 0
         self.value_index = 0
@@ -248,20 +242,38 @@ class IndexedStringWriter(Writer):
             self.index_index = 1
             self.ever_written = True
 
-        for s in values:
-            evalue = s.encode()
-            for v in evalue:
-                self.values[self.value_index] = v
-                self.value_index += 1
-                if self.value_index == self.datastore.chunksize:
-                    DataWriter.write(self.field, 'values', self.values, self.value_index)
-                    self.value_index = 0
-                self.accumulated += 1
-            self.indices[self.index_index] = self.accumulated
-            self.index_index += 1
-            if self.index_index == self.datastore.chunksize:
-                DataWriter.write(self.field, 'index', self.indices, self.index_index)
-                self.index_index = 0
+        encoded, lengths = utils.encode_strings(values)
+        indices = np.cumsum(lengths)
+        # offset the part's indices by the bytes already written, in place
+        indices += self.accumulated
+        if len(indices) > 0:
+            self.accumulated = int(indices[-1])
+        self.value_index = self._buffer(self.values, self.value_index, 'values', encoded)
+        self.index_index = self._buffer(self.indices, self.index_index, 'index', indices)
+
+    def _buffer(self, buffer, buffer_index, name, data):
+        """
+        Copy data into buffer from buffer_index onwards, writing the buffer out whenever it
+        is full and more data remains, and return the index of the buffer's first unused
+        element. Spans of data that would fill an empty buffer, with more data to follow, are
+        written directly.
+        """
+        start = 0
+        while start < len(data):
+            if buffer_index == len(buffer):
+                DataWriter.write(self.field, name, buffer, buffer_index)
+                buffer_index = 0
+            if buffer_index == 0 and len(data) - start > len(buffer):
+                # a whole buffer's worth of data, with more to follow, is written straight from
+                # data, as copying it into the buffer first would gain nothing
+                DataWriter.write(self.field, name, data[start:start + len(buffer)], len(buffer))
+                start += len(buffer)
+                continue
+            count = min(len(buffer) - buffer_index, len(data) - start)
+            buffer[buffer_index:buffer_index + count] = data[start:start + count]
+            buffer_index += count
+            start += count
+        return buffer_index
 
     def flush(self):
         if self.value_index != 0 or 'values' not in self.field:
@@ -281,10 +293,13 @@ class IndexedStringWriter(Writer):
         self.flush()
 
     def write_part_raw(self, index, values):
-        if index.dtype != np.int64:
-            raise ValueError(f"'index' must be an ndarray of '{np.int64}'")
-        if values.dtype not in (np.uint8, 'S1'):
-            raise ValueError(f"'values' must be an ndarray of '{np.uint8}' or 'S1'")
+        # callers pass arrays produced by other indexed string fields, so the dtypes are only
+        # checked in debug runs; 'python -O' skips them
+        if __debug__:
+            if index.dtype != np.int64:
+                raise ValueError(f"'index' must be an ndarray of '{np.int64}'")
+            if values.dtype not in (np.uint8, 'S1'):
+                raise ValueError(f"'values' must be an ndarray of '{np.uint8}' or 'S1'")
         DataWriter.write(self.field, 'index', index, len(index))
         DataWriter.write(self.field, 'values', values, len(values))
 
@@ -293,35 +308,87 @@ class IndexedStringWriter(Writer):
         self.flush()
 
 
+def _categories_to_values(values, key_names, key_values, buffers=None):
+    """
+    Map each string in values to the value of the matching key, finding every value in the
+    sorted keys with one binary search of the whole chunk rather than looking values up row by
+    row. Unmatched strings map to -1 and are reported through the returned mask. If buffers is
+    given, it is a (results, unmatched, matches) triple of arrays at least as long as values,
+    whose leading slices are used instead of allocating new arrays.
+    """
+    values = np.asarray(values)
+    count = len(values)
+    if buffers is None:
+        buffers = _categories_buffers(count, key_values.dtype)
+    results, unmatched, matches = (b[:count] for b in buffers)
+    if len(key_names) == 0 or values.dtype.kind != key_names.dtype.kind:
+        # values that can't be searched for among the keys, such as a list of objects, are
+        # looked up one at a time
+        lookup = dict(zip(key_names.tolist(), key_values.tolist()))
+        results[:] = np.fromiter((lookup.get(v, -1) for v in values.tolist()),
+                                 dtype=np.int64, count=count)
+        matches[:] = np.fromiter((v in lookup for v in values.tolist()), dtype=bool,
+                                 count=count)
+    else:
+        order = np.argsort(key_names)
+        sorted_names = key_names[order]
+        found = np.searchsorted(sorted_names, values)
+        np.minimum(found, len(sorted_names) - 1, out=found)
+        np.equal(sorted_names[found], values, out=matches)
+        results.fill(-1)
+        np.copyto(results, key_values[order][found], where=matches)
+    np.logical_not(matches, out=unmatched)
+    return results, unmatched
+
+
+def _categories_buffers(length, dtype):
+    return np.empty(length, dtype=dtype), np.empty(length, dtype=bool),\
+        np.empty(length, dtype=bool)
+
+
+def categories_to_arrays(categories, dtype='int8'):
+    """
+    The keys and values of categories as a pair of parallel arrays, which is the form the
+    importers match chunks against.
+    """
+    return np.array(list(categories.keys())), np.array(list(categories.values()), dtype=dtype)
+
+
+def categories_key_size(categories):
+    """
+    The length of the longest key in categories, which is the width the importers' string
+    chunks need to hold any key.
+    """
+    return max(map(len, categories), default=0)
+
+
 # TODO: should produce a warning for unmappable strings and a corresponding filter, rather
 # than raising an exception; or at least have a mode where this is possible
 class LeakyCategoricalImporter:
     def __init__(self, datastore, group, name, categories, out_of_range,
-                 timestamp=None, write_mode='write'):
+                 timestamp=None, write_mode='write', key_size=None, key_arrays=None):
         if timestamp is None:
             timestamp = datastore.timestamp
         self.writer = CategoricalWriter(datastore, group, name,
                                         categories, timestamp, write_mode)
         self.other_values = IndexedStringWriter(datastore, group, f"{name}_{out_of_range}",
                                                 timestamp, write_mode)
-        self.field_size = max([len(k) for k in categories.keys()])
+        self.field_size = categories_key_size(categories) if key_size is None else key_size
+        self.key_names, self.key_values =\
+            categories_to_arrays(categories) if key_arrays is None else key_arrays
+        self._buffers = None
 
     def chunk_factory(self, length):
         return np.zeros(length, dtype=f'U{self.field_size}')
 
     def write_part(self, values):
-        results = np.zeros(len(values), dtype='int8')
-        strresults = list([""] * len(values))
-        keys = self.writer.keys
-        anomalous_count = 0
-        for i in range(len(values)):
-            value = keys.get(values[i], -1)
-            if value != -1:
-                results[i] = value
-            else:
-                anomalous_count += 1
-                results[i] = -1
-                strresults[i] = values[i]
+        if self._buffers is None or len(self._buffers[0]) < len(values):
+            self._buffers = _categories_buffers(len(values), self.key_values.dtype)
+        results, unmatched = _categories_to_values(values, self.key_names, self.key_values,
+                                                   self._buffers)
+        strresults = [""] * len(values)
+        for i in np.flatnonzero(unmatched).tolist():
+            strresults[i] = values[i]
         self.writer.write_part(results)
         self.other_values.write_part(strresults)
 
@@ -340,21 +407,26 @@ class LeakyCategoricalImporter:
 # than raising an exception; or at least have a mode where this is possible
 class CategoricalImporter:
     def __init__(self, datastore, group, name, categories,
-                 timestamp=None, write_mode='write'):
+                 timestamp=None, write_mode='write', key_size=None, key_arrays=None):
         if timestamp is None:
             timestamp = datastore.timestamp
         self.writer = CategoricalWriter(datastore, group, name,
                                         categories, timestamp, write_mode)
-        self.field_size = max([len(k) for k in categories.keys()])
+        self.field_size = categories_key_size(categories) if key_size is None else key_size
+        self.key_names, self.key_values =\
+            categories_to_arrays(categories) if key_arrays is None else key_arrays
+        self._buffers = None
 
     def chunk_factory(self, length):
         return np.zeros(length, dtype=f'U{self.field_size}')
 
     def write_part(self, values):
-        results = np.zeros(len(values), dtype='int8')
-        keys = self.writer.keys
-        for i in range(len(values)):
-            results[i] = keys[values[i]]
+        if self._buffers is None or len(self._buffers[0]) < len(values):
+            self._buffers = _categories_buffers(len(values), self.key_values.dtype)
+        results, unmatched = _categories_to_values(values, self.key_names, self.key_values,
+                                                   self._buffers)
+        if unmatched.any():
+            raise KeyError(values[np.argmax(unmatched)])
         self.writer.write_part(results)
 
     def flush(self):
@@ -424,6 +496,12 @@ class NumericImporter:
         self.parser = parser
         self.invalid_value = invalid_value
         self.validation_mode = validation_mode
+        # resolved once here rather than per row in write_part
+        self._strict = validation_mode == 'strict'
+        self._allow_empty = validation_mode == 'allow_empty'
+        self._converter = getattr(parser, 'converter', None)
+        self._elements = None
+        self._validity = None
 
     def chunk_factory(self, length):
         return [None] * length
@@ -436,25 +514,41 @@ class NumericImporter:
         
         :param values: a list of strings to be parsed
         """
-        elements = np.zeros(len(values), dtype=self.data_writer.nformat)
-        validity = np.zeros(len(values), dtype='bool')
-        for i in range(len(values)):
-            valid, value = self.parser(values[i], self.invalid_value)
-
-            elements[i] = value
-            validity[i] = valid
-
-            if self.validation_mode == 'strict' and not valid:
-                if self._is_blank_str(values[i]):
-                    raise ValueError(f"Numeric value in the field '{self.field_name}' can not be empty in strict mode")
-                else:
+        # values are parsed straight into buffers obtained from the writers once and reused for
+        # every part; each element of the written slice is set below
+        if self._elements is None or len(self._elements) < len(values):
+            self._elements = self.data_writer.chunk_factory(len(values))
+            self._validity = np.zeros(len(values), dtype='bool')
+        elements = self._elements[:len(values)]
+        validity = self._validity[:len(values)]
+        if self._converter is not None:
+            results, invalid_rows = utils.convert_all_numbers(self._converter, values, self.invalid_value)
+            elements[:] = results
+            validity.fill(True)
+            validity[invalid_rows] = False
+        else:
+            parser = self.parser
+            invalid_value = self.invalid_value
+            for i in range(len(values)):
+                valid, value = parser(values[i], invalid_value)
+                elements[i] = value
+                validity[i] = valid
+            invalid_rows = np.flatnonzero(~validity)
+
+        # only the rows that failed to parse need checking against the validation mode
+        if self._strict or self._allow_empty:
+            for i in invalid_rows:
+                if self._strict:
+                    if self._is_blank_str(values[i]):
+                        raise ValueError(f"Numeric value in the field '{self.field_name}' can not be empty in strict mode")
+                    else:
+                        raise ValueError(
+                            f"The following numeric value in the field '{self.field_name}' can not be parsed:{values[i].strip()}")
+
+                if self._allow_empty and not self._is_blank_str(values[i]):
                     raise ValueError(
                         f"The following numeric value in the field '{self.field_name}' can not be parsed:{values[i].strip()}")
 
-            if self.validation_mode == 'allow_empty' and not self._is_blank_str(values[i]) and not valid:
-                raise ValueError(
-                    f"The following numeric value in the field '{self.field_name}' can not be parsed:{values[i].strip()}")
-
         self.data_writer.write_part(elements)
         if self.flag_writer is not None:
             self.flag_writer.write_part(validity)
@@ -563,27 +657,20 @@ class DateTimeImporter:
 
     def write_part(self, values):
         # TODO: use a timestamp writer instead of a datetime writer and do the conversion here
-        self.datetime.write_part(values)
+        # the flags are filled in by the datetime writer as it parses the values
+        flags = None if self.datetimeset is None else\
+            self.datetimeset.chunk_factory(len(values))
+        self.datetime.write_part(values, flags)
 
         if self.create_day_field:
             days = self._get_days(values)
             self.datestr.write_part(days)
 
         if self.datetimeset is not None:
-            flags = self._get_flags(values)
             self.datetimeset.write_part(flags)
 
     def _get_days(self, values):
-        days = self.datestr.chunk_factory(len(values))
-        for i in range(len(values)):
-            days[i] = values[i][:10]
-        return days
-
-    def _get_flags(self, values):
-        flags = self.datetimeset.chunk_factory(len(values))
-        for i in range(len(values)):
-            flags[i] = values[i] != b''
-        return flags
+        return np.asarray(values).astype('S10')
 
     def flush(self):
         self.datetime.flush()
@@ -614,28 +701,11 @@ class DateTimeWriter(Writer):
     def chunk_factory(self, length):
         return np.zeros(length, dtype=f'S32')
 
-    def write_part(self, values):
-        timestamps = np.zeros(len(values), dtype=np.float64)
-        for i in range(len(values)):
-            value = values[i].strip()
-            if value == b'':
-                timestamps[i] = 0
-            else:
-                if len(value) == 32:
-                    # ts = datetime.strptime(value.decode(), '%Y-%m-%d %H:%M:%S.%f%z')
-                    ts = datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]),
-                                  int(value[11:13]), int(value[14:16]), int(value[17:19]),
-                                  int(value[20:26]))
-                elif len(value) == 25:
-                    # ts = datetime.strptime(value.decode(), '%Y-%m-%d %H:%M:%S%z')
-                    ts = datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]),
-                                  int(value[11:13]), int(value[14:16]), int(value[17:19]))
-                elif len(value) == 19:
-                    ts = datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]),
-                                  int(value[11:13]), int(value[14:16]), int(value[17:19]))
-                else:
-                    raise ValueError(f"Date field '{self.field}' has unexpected format '{value}'")
-                timestamps[i] = ts.timestamp()
+    def write_part(self, values, filled=None):
+        try:
+            timestamps = utils.datetime_bytes_to_timestamps(values, filled)
+        except ValueError as e:
+            raise ValueError(f"Date field '{self.field}': {e}") from e
         DataWriter.write(self.field, 'values', timestamps, len(timestamps))
 
     def flush(self):
@@ -666,16 +736,8 @@ class DateWriter(Writer):
     def chunk_factory(self, length):
         return np.zeros(length, dtype=f'S10')
 
-    def write_part(self, values):
-
-        timestamps = np.zeros(len(values), dtype=np.float64)
-        for i in range(len(values)):
-            value = values[i]
-            if value == b'':
-                timestamps[i] = 0
-            else:
-                ts = datetime.strptime(value.decode(), '%Y-%m-%d')
-                timestamps[i] = ts.timestamp()
+    def write_part(self, values, filled=None):
+        timestamps = utils.date_bytes_to_timestamps(values, filled)
         DataWriter.write(self.field, 'values', timestamps, len(timestamps))
 
     def flush(self):
@@ -742,25 +804,17 @@ class OptionalDateImporter:
 
     def write_part(self, values):
         # TODO: use a timestamp writer instead of a datetime writer and do the conversion here
-        self.date.write_part(values)
+        # the flags are filled in by the date writer as it parses the values
+        flags = None if self.dateset is None else self.dateset.chunk_factory(len(values))
+        self.date.write_part(values, flags)
         if self.create_day_field:
             days = self._get_days(values)
             self.datestr.write_part(days)
         if self.dateset is not None:
-            flags = self._get_flags(values)
             self.dateset.write_part(flags)
 
     def _get_days(self, values):
-        days = self.datestr.chunk_factory(len(values))
-        for i in range(len(values)):
-            days[i] = values[i][:10]
-        return days
-
-    def _get_flags(self, values):
-        flags = self.dateset.chunk_factory(len(values))
-        for i in range(len(values)):
-            flags[i] = values[i] != b''
-        return flags
+        return np.asarray(values).astype('S10')
 
     def flush(self):
         self.date.flush()
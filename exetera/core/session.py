@@ -10,6 +10,9 @@
 # limitations under the License.
 
 from typing import Callable, IO, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import reduce
 import os
 import uuid
 from datetime import datetime, timezone
@@ -56,6 +59,10 @@ class Session(AbstractSession):
         self.chunksize = chunksize
         self.timestamp = timestamp
         self.datasets = dict()
+        # the pool of result arrays for reuse inside fused_ops
+        self._operation_buffers = None
+        # the maps of the merges performed inside reuse_merge_maps
+        self._merge_maps = None
 
     def __enter__(self):
         """Context manager enter."""
@@ -134,6 +141,60 @@ class Session(AbstractSession):
             v.close()
         self.datasets = dict()
 
+    @contextmanager
+    def fused_ops(self):
+        """
+        Within this context, the arrays of the temporary results of arithmetic, logical and
+        comparison operations on fields are pooled as those results are released, and the
+        results of later operations with the same dtype and length are written into them
+        rather than into newly allocated arrays. In a chained expression such as
+        ``(a + b) * c - d``, the result of ``a + b`` is released once ``* c`` has been
+        computed, and ``- d`` is written into its array. An array is only reused once no field
+        or view of it is still in use, so results that are kept are never overwritten.
+
+        Example::
+
+            with s.fused_ops():
+                df['total'] = (df['a'] + df['b']) * df['c'] - df['d']
+
+        :return: None
+        """
+        if self._operation_buffers is not None:
+            yield
+            return
+        self._operation_buffers = fld.OperationBufferPool()
+        try:
+            yield
+        finally:
+            self._operation_buffers.close()
+            self._operation_buffers = None
+
+    @contextmanager
+    def reuse_merge_maps(self):
+        """
+        Within this context, dataframe merges on the same key field objects and with the same
+        'how' reuse the merge maps of the first such merge rather than joining the keys again,
+        such as when further fields are merged from the same pair of dataframes. The key fields
+        must not be rewritten inside the context, as the maps are not regenerated when they
+        change. The maps are released when the context exits.
+
+        Example::
+
+            with s.reuse_merge_maps():
+                dataframe.merge(ldf, rdf, ddf1, 'id', 'l_id', right_fields=['a'])
+                dataframe.merge(ldf, rdf, ddf2, 'id', 'l_id', right_fields=['b'])
+
+        :return: None
+        """
+        if self._merge_maps is not None:
+            yield
+            return
+        self._merge_maps = list()
+        try:
+            yield
+        finally:
+            self._merge_maps = None
+
     def get_shared_index(self, keys: Tuple[np.ndarray]):
         """
         Create a shared index based on a tuple of numpy arrays containing keys.
@@ -361,7 +422,9 @@ class Session(AbstractSession):
 
         Only one of 'field' or 'fields' may be set. If 'fields' is used and more
         than one field specified, the fields are effectively zipped and the check
-        for spans is carried out on each corresponding tuple in the zipped field.
+        for spans is carried out on each corresponding tuple in the zipped field,
+        so that a span ends wherever any of the fields changes value. Any number
+        of fields may be zipped in this way.
 
         Example::
         
@@ -374,11 +437,16 @@ class Session(AbstractSession):
 
         :Keyword Arguments:
             * field -- Similar to field parameter, in case user specify field as keyword
-            * fields -- A tuple of Fields or tuple of numpy arrays to be evaluated for spans
+            * fields -- A tuple of Fields or tuple of numpy arrays to be evaluated for spans. It
+              can only be passed as a keyword, as there is no positional parameter for it
             * dest -- Similar to dest parameter, in case user specify as keyword
 
         :return: The resulting set of spans as a numpy array
         """
+        field = kwargs.get('field', field)
+        fields = kwargs.get('fields', None)
+        dest = kwargs.get('dest', dest)
+
         result = None
         if dest is not None and not isinstance(dest, Field):
             raise TypeError(f"'dest' must be one of 'Field' but is {type(dest)}")
@@ -388,11 +456,20 @@ class Session(AbstractSession):
                 result = field.get_spans()
             elif isinstance(field, np.ndarray):
                 result = ops.get_spans_for_field(field)
-        elif len(fields) > 0:
+        elif fields is not None and len(fields) > 0:
             if isinstance(fields[0], Field):
-                result = ops._get_spans_for_2_fields_by_spans(fields[0].get_spans(), fields[1].get_spans())
+                # the spans of each field are independent, and reading a field from hdf5
+                # releases the gil, so they are calculated concurrently and then merged
+                max_workers = min(len(fields), os.cpu_count() or 1)
+                with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                    field_spans = list(executor.map(lambda f: f.get_spans(), fields))
+                result = reduce(self._merge_spans, field_spans)
             elif isinstance(fields[0], np.ndarray):
-                result = ops._get_spans_for_2_fields(fields[0], fields[1])
+                if len(fields) == 2:
+                    result = ops._get_spans_for_2_fields(fields[0], fields[1])
+                else:
+                    result = reduce(self._merge_spans,
+                                    [ops.get_spans_for_field(f) for f in fields])
         else:
             raise ValueError("One of 'field' and 'fields' must be set")
 
@@ -402,6 +479,10 @@ class Session(AbstractSession):
         else:
             return result
 
+    @staticmethod
+    def _merge_spans(spans_0, spans_1):
+        return np.asarray(ops._get_spans_for_2_fields_by_spans(spans_0, spans_1))
+
     def _apply_spans_no_src(self,
                             predicate: Callable[[np.ndarray, np.ndarray], None],
                             spans: np.ndarray,
@@ -874,7 +955,8 @@ class Session(AbstractSession):
         if isinstance(field, Field):
             return field
 
-        if 'fieldtype' not in field.attrs.keys():
+        fieldtype = field.attrs.get('fieldtype')
+        if fieldtype is None:
             raise ValueError(f"'{field}' is not a well-formed field")
 
         fieldtype_map = {
@@ -888,7 +970,7 @@ class Session(AbstractSession):
             'timestamp': fld.TimestampField
         }
 
-        fieldtype = field.attrs['fieldtype'].split(',')[0]
+        fieldtype = fieldtype.split(',')[0]
         return fieldtype_map[fieldtype](self, field, None, field.name)
 
     def create_like(self, field, dest_group, dest_name, timestamp=None, chunksize=None):
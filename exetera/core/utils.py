@@ -9,17 +9,35 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
 import time
 from collections import defaultdict
 import csv
-from datetime import datetime
+import re
+from datetime import datetime, timedelta, timezone
 from io import StringIO
+from _strptime import _strptime_datetime
 
 import numpy as np
 from numba import njit
 
 
 SECONDS_PER_DAY = 86400
+_EPOCH_ORDINAL = datetime(1970, 1, 1).toordinal()
+
+# strptime formats, called through _strptime_datetime, which is what datetime.strptime wraps
+_DATETIME_US_FORMAT = '%Y-%m-%d %H:%M:%S.%f%z'
+_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S%z'
+_DATE_FORMAT = '%Y-%m-%d'
+_STRPTIME_FORMATS = (_DATETIME_US_FORMAT, _DATETIME_FORMAT, _DATE_FORMAT)
+# the formats to try for fields of each length, starting with the one that fields of that
+# length are usually in; a field can match at most one of the formats, so order doesn't
+# change the result
+_STRPTIME_FORMATS_BY_LENGTH = {
+    32: _STRPTIME_FORMATS,
+    25: (_DATETIME_FORMAT, _DATETIME_US_FORMAT, _DATE_FORMAT),
+    10: (_DATE_FORMAT, _DATETIME_US_FORMAT, _DATETIME_FORMAT)
+}
 
 
 def validate_file_exists(file_name):
@@ -75,16 +93,557 @@ def timestamp_to_day(field):
     return f'{field[0:4]}-{field[5:7]}-{field[8:10]}'
 
 
-def string_to_datetime(field):
+# 'YYYY-MM-DD HH:MM:SS[.ffffff]+HH:MM', the layout that almost every aware datetime is in
+_CANONICAL_DATETIME = re.compile(
+    r'(\d{4})-(\d\d)-(\d\d) (\d\d):(\d\d):(\d\d)(?:\.(\d{6}))?([+-])(\d\d):(\d\d)', re.ASCII)
+# the timezones of the utc offsets seen so far, as values rarely have more than a few
+_UTC_OFFSET_TIMEZONES = dict()
+
+
+def _canonical_string_to_datetime(field):
+    """
+    Build the datetime for a field in the canonical layout straight from its digits, or
+    return None if it isn't in that layout or strptime would reject it.
+    """
+    match = _CANONICAL_DATETIME.fullmatch(field)
+    if match is None:
+        return None
+    year, month, day, hour, minute, second, microsecond, sign, tz_hour, tz_minute =\
+        match.groups()
+    if int(tz_minute) > 59:
+        return None
+    offset = field[-6:]
+    tz = _UTC_OFFSET_TIMEZONES.get(offset)
     try:
-        ts = datetime.strptime(field, '%Y-%m-%d %H:%M:%S.%f%z')
+        if tz is None:
+            delta = timedelta(hours=int(tz_hour), minutes=int(tz_minute))
+            tz = timezone(-delta if sign == '-' else delta)
+            _UTC_OFFSET_TIMEZONES[offset] = tz
+        return datetime(int(year), int(month), int(day), int(hour), int(minute), int(second),
+                        int(microsecond or 0), tz)
     except ValueError:
+        return None
+
+
+def string_to_datetime(field):
+    ts = _canonical_string_to_datetime(field)
+    if ts is not None:
+        return ts
+    formats = _STRPTIME_FORMATS_BY_LENGTH.get(len(field), _STRPTIME_FORMATS)
+    for f in formats[:-1]:
         try:
-            ts = datetime.strptime(field, '%Y-%m-%d %H:%M:%S%z')
+            return _strptime_datetime(datetime, field, f)
         except ValueError:
-            ts = datetime.strptime(field, '%Y-%m-%d')
+            pass
+    return _strptime_datetime(datetime, field, formats[-1])
+
+
+@njit
+def days_from_civil(year, month, day):
+    """
+    Number of days from 1970-01-01 to the given proleptic Gregorian date, using Howard
+    Hinnant's days_from_civil algorithm.
+    """
+    if month <= 2:
+        year -= 1
+    era = year // 400
+    yoe = year - era * 400
+    doy = (153 * ((month + 9) % 12) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
 
-    return ts
+@njit
+def _is_space(c):
+    return c == 32 or (c >= 9 and c <= 13)
+
+
+@njit
+def _decode_digits(raw, row, start, count):
+    value = 0
+    for k in range(start, start + count):
+        d = raw[row, k] - 48
+        if d < 0 or d > 9:
+            return -1
+        value = value * 10 + d
+    return value
+
+
+@njit
+def _trimmed_extent(raw, row):
+    end = raw.shape[1]
+    while end > 0 and (raw[row, end - 1] == 0 or _is_space(raw[row, end - 1])):
+        end -= 1
+    start = 0
+    while start < end and _is_space(raw[row, start]):
+        start += 1
+    return start, end
+
+
+# the days in each month of a common year, indexed from 1; an array rather than a tuple, which
+# numba would rebuild for every lookup by a runtime index
+_DAYS_IN_MONTH = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31], dtype=np.int64)
+
+
+@njit
+def _decode_date(raw, row, start):
+    """
+    Decode the 'YYYY-MM-DD' starting at raw[row, start] into days since the epoch. The first
+    element of the result is False if the date is malformed.
+    """
+    days_in_month = _DAYS_IN_MONTH
+    year = _decode_digits(raw, row, start, 4)
+    month = _decode_digits(raw, row, start + 5, 2)
+    day = _decode_digits(raw, row, start + 8, 2)
+    if year < 1 or month < 1 or month > 12 or day < 1:
+        return False, 0
+    leap = year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)
+    if day > days_in_month[month] + (1 if leap and month == 2 else 0):
+        return False, 0
+    return True, days_from_civil(year, month, day)
+
+
+def _build_dfa(patterns):
+    """
+    Build the transition table of a dfa that accepts byte strings matching any of patterns.
+    Each pattern is a tuple of (byte classes, layout), where each byte class is the bytes
+    allowed at that position. State 0 rejects, state 1 is the start state, and the returned
+    layouts give the layout of each state's match; -1 if it isn't a match.
+    """
+    transitions = [np.zeros(256, dtype=np.uint8), np.zeros(256, dtype=np.uint8)]
+    layouts = [-1, -1]
+    for classes, layout in patterns:
+        state = 1
+        for allowed in classes:
+            first = transitions[state][allowed[0]]
+            if first == 0:
+                first = len(transitions)
+                transitions.append(np.zeros(256, dtype=np.uint8))
+                layouts.append(-1)
+                for b in allowed:
+                    transitions[state][b] = first
+            state = first
+        layouts[state] = layout
+    return np.stack(transitions), np.array(layouts, dtype=np.int8)
+
+
+_DIGIT = b'0123456789'
+_DATE_CLASSES = (_DIGIT,) * 4 + (b'-',) + (_DIGIT,) * 2 + (b'-',) + (_DIGIT,) * 2
+_TIME_CLASSES = (b' T',) + (_DIGIT,) * 2 + (b':',) + (_DIGIT,) * 2 + (b':',) + (_DIGIT,) * 2
+_MICROSECOND_CLASSES = (b'.',) + (_DIGIT,) * 6
+_UTC_OFFSET_CLASSES = (b'+-',) + (_DIGIT,) * 2 + (b':',) + (_DIGIT,) * 2
+
+# layouts are 0 for empty values, 1 for datetimes without microseconds and 2 for those with
+_DATETIME_TRANSITIONS, _DATETIME_LAYOUTS = _build_dfa((
+    ((), 0),
+    (_DATE_CLASSES + _TIME_CLASSES, 1),
+    (_DATE_CLASSES + _TIME_CLASSES + _UTC_OFFSET_CLASSES, 1),
+    (_DATE_CLASSES + _TIME_CLASSES + _MICROSECOND_CLASSES + _UTC_OFFSET_CLASSES, 2)))
+
+
+@njit(nogil=True)
+def _parse_datetime_bytes(raw, wall, microseconds, filled):
+    """
+    Decode rows of 'YYYY-MM-DD HH:MM:SS[.ffffff][+HH:MM]' bytes into seconds since the epoch
+    (ignoring any utc offset) and microseconds. Returns the first malformed row, or -1.
+    """
+    transitions = _DATETIME_TRANSITIONS
+    layouts = _DATETIME_LAYOUTS
+    for i in range(raw.shape[0]):
+        start, end = _trimmed_extent(raw, i)
+        state = 1
+        for k in range(start, end):
+            state = transitions[state, raw[i, k]]
+        layout = layouts[state]
+        if layout < 0:
+            return i
+        filled[i] = layout > 0
+        if layout == 0:
+            continue
+
+        valid, days = _decode_date(raw, i, start)
+        hour = _decode_digits(raw, i, start + 11, 2)
+        minute = _decode_digits(raw, i, start + 14, 2)
+        second = _decode_digits(raw, i, start + 17, 2)
+        # microseconds are decoded for every layout and masked out where there aren't any;
+        # rows without them read columns 20-26, which are always in bounds
+        has_us = layout >> 1
+        us = _decode_digits(raw, i, 20 + start * has_us, 6)
+        # the dfa has checked the digits, so only the ranges of the fields are left to check
+        if (not valid) | (hour > 23) | (minute > 59) | (second > 59):
+            return i
+
+        wall[i] = days * 86400 + hour * 3600 + minute * 60 + second
+        microseconds[i] = us * has_us
+    return -1
+
+
+@njit(nogil=True)
+def _parse_aware_datetime_bytes(raw, results, optional):
+    """
+    Decode rows of exactly 'YYYY-MM-DD HH:MM:SS[.ffffff]+HH:MM' ascii bytes, padded with
+    nulls, into timestamps, applying each row's utc offset. Empty rows are set to nan if
+    optional is True. Returns the first malformed row, or -1.
+    """
+    transitions = _DATETIME_TRANSITIONS
+    layouts = _DATETIME_LAYOUTS
+    for i in range(raw.shape[0]):
+        # the layouts are fixed, so a row's length alone says whether it has microseconds
+        length = 0
+        for k in range(raw.shape[1]):
+            if raw[i, k] > 127:
+                return i
+            if raw[i, k] != 0:
+                length += 1
+        if length == 0:
+            if not optional:
+                return i
+            results[i] = np.nan
+            continue
+        if length != 25 and length != 32:
+            return i
+        state = 1
+        for k in range(length):
+            state = transitions[state, raw[i, k]]
+        if layouts[state] < 1:
+            return i
+
+        valid, days = _decode_date(raw, i, 0)
+        hour = _decode_digits(raw, i, 11, 2)
+        minute = _decode_digits(raw, i, 14, 2)
+        second = _decode_digits(raw, i, 17, 2)
+        if (not valid) | (hour > 23) | (minute > 59) | (second > 59):
+            return i
+        us = _decode_digits(raw, i, 20, 6) if length == 32 else 0
+        offset = _decode_digits(raw, i, length - 5, 2) * 3600 +\
+            _decode_digits(raw, i, length - 2, 2) * 60
+        if raw[i, length - 6] == 45:
+            offset = -offset
+
+        wall = days * 86400 + hour * 3600 + minute * 60 + second
+        results[i] = ((wall - offset) * 1000000 + us) / 1e6
+    return -1
+
+
+@njit(nogil=True)
+def _parse_date_bytes(raw, wall, filled):
+    """
+    Decode rows of 'YYYY-MM-DD' bytes into seconds since the epoch. Returns the first row
+    that isn't in that form, or -1.
+    """
+    for i in range(raw.shape[0]):
+        start, end = _trimmed_extent(raw, i)
+        if end == start:
+            filled[i] = False
+            continue
+        if end - start != 10 or raw[i, start + 4] != 45 or raw[i, start + 7] != 45:
+            return i
+        filled[i] = True
+        valid, days = _decode_date(raw, i, start)
+        if not valid:
+            return i
+        wall[i] = days * 86400
+    return -1
+
+
+# parts at least this long are parsed in slices, one per cpu, on worker threads
+PARSE_SPLIT_MIN_LENGTH = 1 << 16
+
+
+def _parse_in_slices(executor, kernel, raw, outputs, *args):
+    """
+    Call kernel(raw, *outputs, *args), returning the first malformed row or -1. The parse
+    kernels release the gil, so if an executor is given, raw and outputs are split into a
+    slice per cpu, each parsed on its own thread.
+    """
+    if executor is None:
+        return kernel(raw, *outputs, *args)
+    workers = os.cpu_count() or 1
+    bounds = np.linspace(0, len(raw), workers + 1).astype(np.int64).tolist()
+    futures = [executor.submit(kernel, raw[start:stop], *(o[start:stop] for o in outputs),
+                               *args)
+               for start, stop in zip(bounds[:-1], bounds[1:])]
+    for start, future in zip(bounds, futures):
+        bad = future.result()
+        if bad != -1:
+            return start + bad
+    return -1
+
+
+def _local_utc_offsets(wall):
+    """
+    The offsets that datetime.timestamp adds to naive local times, given as seconds since
+    1970-01-01 00:00:00 local time. Offsets are looked up once per distinct day, and once per
+    distinct quarter hour on days during which the offset changes.
+    """
+    if len(wall) == 0:
+        return np.zeros(0, dtype=np.int64)
+    epoch = datetime(1970, 1, 1)
+
+    def offset(seconds):
+        return int((epoch + timedelta(seconds=seconds)).timestamp()) - seconds
+
+    day = wall // SECONDS_PER_DAY
+    first_day = day.min()
+    inverse = day - first_day
+    present = np.zeros(inverse.max() + 1, dtype=bool)
+    present[inverse] = True
+    days = np.flatnonzero(present)
+    inverse = np.cumsum(present)[inverse] - 1
+    days += first_day
+    starts = np.array([offset(int(d) * SECONDS_PER_DAY) for d in days], dtype=np.int64)
+    # the end of a day is taken as its last second rather than the next midnight, which for
+    # 9999-12-31 is out of the range of datetime
+    ends = np.array([offset((int(d) + 1) * SECONDS_PER_DAY - 1) for d in days], dtype=np.int64)
+    offsets = starts[inverse]
+    changing = (starts != ends)[inverse]
+    if changing.any():
+        quarters, q_inverse = np.unique(wall[changing] // 900, return_inverse=True)
+        q_offsets = np.array([offset(int(q) * 900) for q in quarters], dtype=np.int64)
+        offsets[changing] = q_offsets[q_inverse]
+    return offsets
+
+
+def _unicode_to_bytes(values):
+    """
+    Encode a 'U' array as utf-8 bytes. Ascii values are narrowed straight from their padded
+    code points, as a (rows, width) array, rather than being encoded one string at a time.
+    """
+    width = values.dtype.itemsize // 4
+    if width == 0 or len(values) == 0:
+        return values.astype('S1')
+    codes = np.ascontiguousarray(values).view(np.uint32).reshape(-1, width)
+    if codes.max() >= 128:
+        return np.char.encode(values, 'utf-8')
+    return codes.astype(np.uint8).view(f'S{width}').ravel()
+
+
+def _fixed_bytes(values, width):
+    values = np.asarray(values)
+    if values.dtype.kind == 'U':
+        values = _unicode_to_bytes(values)
+    if values.dtype.itemsize > width:
+        values = np.char.strip(values)
+        too_long = np.char.str_len(values) > width
+        if too_long.any():
+            raise ValueError(f"Value '{values[too_long][0]}' has an unexpected format")
+    return np.ascontiguousarray(values, dtype=f'S{width}')
+
+
+def date_bytes_to_timestamps(values, filled=None, out=None, executor=None):
+    """
+    Convert an array of 'YYYY-MM-DD' byte strings into the timestamps of local midnight on
+    those dates, as datetime.strptime(value, '%Y-%m-%d').timestamp() would. Empty strings are
+    converted to 0. Values that strptime accepts but that aren't in the canonical fixed width
+    form (such as '2020-1-5') are converted by strptime. If filled is given, it is set to
+    whether each value was non-empty. If out is given, the timestamps are written to it and
+    it is returned, rather than a new array. If executor is given, the values are parsed on
+    its threads, a slice per cpu.
+    """
+    if len(values) == 0:
+        return np.zeros(0, dtype=np.float64) if out is None else out
+    if filled is None:
+        filled = np.zeros(len(values), dtype=bool)
+    try:
+        values = _fixed_bytes(values, 10)
+    except ValueError:
+        bad = 0
+        # the fallback below works on bytes, whatever the caller passed
+        values = np.asarray(values)
+        if values.dtype.kind == 'U':
+            values = np.char.encode(values, 'utf-8')
+    else:
+        wall = np.zeros(len(values), dtype=np.int64)
+        bad = _parse_in_slices(executor, _parse_date_bytes,
+                               values.view(np.uint8).reshape(-1, 10), (wall, filled))
+    if bad != -1:
+        wall = np.zeros(len(values), dtype=np.int64)
+        # dates repeat heavily, so each distinct value is only passed to strptime once; only
+        # its day number is kept, and the local offsets are added below along with the rest
+        parsed = dict()
+        for i, value in enumerate(values):
+            if value != b'':
+                days = parsed.get(value)
+                if days is None:
+                    days = _strptime_datetime(datetime, value.decode(), _DATE_FORMAT)\
+                        .toordinal() - _EPOCH_ORDINAL
+                    parsed[value] = days
+                wall[i] = days * SECONDS_PER_DAY
+        filled[:] = np.asarray(values) != b''
+
+    wall = wall[filled]
+    if out is None:
+        timestamps = np.zeros(len(values), dtype=np.float64)
+    else:
+        timestamps = out
+        timestamps[~filled] = 0
+    timestamps[filled] = (wall + _local_utc_offsets(wall)).astype(np.float64)
+    return timestamps
+
+
+def datetime_bytes_to_timestamps(values, filled=None):
+    """
+    Convert an array of 'YYYY-MM-DD HH:MM:SS[.ffffff][+HH:MM]' byte strings into
+    timestamps. As with datetime.timestamp on a naive datetime, the values are interpreted
+    as local time and any utc offset suffix is ignored. Empty strings are converted to 0. If
+    filled is given, it is set to whether each value was non-empty.
+    """
+    if len(values) == 0:
+        return np.zeros(0, dtype=np.float64)
+    values = _fixed_bytes(values, 32)
+    raw = values.view(np.uint8).reshape(-1, 32)
+
+    wall = np.zeros(len(values), dtype=np.int64)
+    microsecond = np.zeros(len(values), dtype=np.int64)
+    if filled is None:
+        filled = np.zeros(len(values), dtype=bool)
+    bad = _parse_datetime_bytes(raw, wall, microsecond, filled)
+    if bad != -1:
+        raise ValueError(f"Datetime value '{values[bad]}' has an unexpected format")
+    wall = wall[filled]
+    microsecond = microsecond[filled]
+
+    timestamps = np.zeros(len(values), dtype=np.float64)
+    timestamps[filled] = (wall + _local_utc_offsets(wall)).astype(np.float64) +\
+        microsecond / 1e6
+    return timestamps
+
+
+def convert_all(converter, values, invalid=0):
+    """
+    Convert every entry of values with converter, in a single pass rather than with a call to
+    a parser for each entry. Entries that converter rejects with a ValueError are replaced by
+    invalid, and their positions are returned along with the converted list.
+    """
+    results = list()
+    invalid_rows = list()
+    remaining = iter(values)
+    while True:
+        try:
+            # map stops at the entry that failed, having consumed it, so the conversion
+            # carries on from the entry after it
+            results.extend(map(converter, remaining))
+            return results, invalid_rows
+        except ValueError:
+            invalid_rows.append(len(results))
+            results.append(invalid)
+
+
+def encode_strings(values):
+    """
+    The utf-8 encoding of the strings in values, concatenated into a uint8 array, along with
+    the length of each string's encoding. The strings are encoded together rather than one at
+    a time; they are only measured one at a time when they aren't all ascii, which is the
+    only case in which the lengths of their encodings differ from their lengths.
+    """
+    lengths = np.fromiter(map(len, values), dtype=np.int64, count=len(values))
+    raw = ''.join(values).encode()
+    if len(raw) != lengths.sum():
+        lengths = np.fromiter((len(v.encode()) for v in values), dtype=np.int64,
+                              count=len(values))
+    return np.frombuffer(raw, dtype=np.uint8), lengths
+
+
+# the powers of ten that are exactly representable as doubles
+_EXACT_POWERS_OF_TEN = np.array([10.0 ** k for k in range(23)])
+
+
+@njit(nogil=True)
+def _parse_plain_ints(raw, ends, results, plain):
+    """
+    Decode the rows of raw, each ending at the corresponding entry of ends, that are an
+    optionally signed run of at most 18 ascii digits, which always fits in an int64. Rows in
+    any other form are flagged as not plain.
+    """
+    start = 0
+    for i in range(len(ends)):
+        end = ends[i]
+        j = start
+        negative = False
+        if j < end and (raw[j] == 43 or raw[j] == 45):
+            negative = raw[j] == 45
+            j += 1
+        ok = j < end and end - j <= 18
+        value = 0
+        while ok and j < end:
+            digit = raw[j] - 48
+            ok = 0 <= digit <= 9
+            value = value * 10 + digit
+            j += 1
+        plain[i] = ok
+        results[i] = -value if negative else value
+        start = end
+
+
+@njit(nogil=True)
+def _parse_plain_floats(raw, ends, results, plain):
+    """
+    Decode the rows of raw, each ending at the corresponding entry of ends, that are an
+    optionally signed decimal with at most 15 digits and no exponent. Their digits and the
+    power of ten that scales them are both exact doubles, so a single division rounds them
+    just as float does. Rows in any other form are flagged as not plain.
+    """
+    start = 0
+    for i in range(len(ends)):
+        end = ends[i]
+        j = start
+        negative = False
+        if j < end and (raw[j] == 43 or raw[j] == 45):
+            negative = raw[j] == 45
+            j += 1
+        digits = 0
+        scale = -1
+        mantissa = 0
+        ok = j < end
+        while ok and j < end:
+            c = raw[j]
+            if c == 46 and scale < 0:
+                scale = 0
+            elif 48 <= c <= 57:
+                mantissa = mantissa * 10 + (c - 48)
+                digits += 1
+                if scale >= 0:
+                    scale += 1
+            else:
+                ok = False
+            j += 1
+        ok = ok and 0 < digits <= 15
+        plain[i] = ok
+        value = mantissa / _EXACT_POWERS_OF_TEN[max(scale, 0)] if ok else 0.0
+        results[i] = -value if negative else value
+        start = end
+
+
+# the compiled parsers for the plain forms that each converter accepts, with their result type
+_PLAIN_NUMBER_PARSERS = {int: (_parse_plain_ints, np.int64),
+                         float: (_parse_plain_floats, np.float64)}
+
+
+def convert_all_numbers(converter, values, invalid=0):
+    """
+    As convert_all, but for a list of strings converted with int or float, values in the plain
+    forms that numeric columns mostly hold are decoded in a single compiled pass that releases
+    the gil, and only the remaining values are passed to converter.
+    """
+    if converter not in _PLAIN_NUMBER_PARSERS or not isinstance(values, list) or not values:
+        return convert_all(converter, values, invalid)
+    ends = np.cumsum(np.fromiter(map(len, values), dtype=np.int64, count=len(values)))
+    raw = ''.join(values).encode()
+    if len(raw) != ends[-1]:
+        # offsets into the text only match offsets into its bytes when all of it is ascii
+        return convert_all(converter, values, invalid)
+    parse, dtype = _PLAIN_NUMBER_PARSERS[converter]
+    results = np.empty(len(values), dtype=dtype)
+    plain = np.empty(len(values), dtype=bool)
+    parse(np.frombuffer(raw, dtype=np.uint8), ends, results, plain)
+    invalid_rows = list()
+    for i in np.flatnonzero(~plain).tolist():
+        try:
+            results[i] = converter(values[i])
+        except ValueError:
+            results[i] = invalid
+            invalid_rows.append(i)
+    return results, invalid_rows
 
 
 def build_histogram(dataset, filtered_records=None, tx=None):
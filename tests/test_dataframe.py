@@ -67,11 +67,11 @@ class TestDataFrameCreateFields(unittest.TestCase):
             a = df.create_numeric('a','int32')
             a.data.write(values)
 
-            total = np.sum(a.data[:])
+            total = a.data.sum()
             self.assertEqual(49997540637149, total)
 
-            a.data[:] = a.data[:] * 2
-            total = np.sum(a.data[:])
+            a.data.inplace_apply(np.multiply, 2)
+            total = a.data.sum()
             self.assertEqual(99995081274298, total)
 
     def test_dataframe_create_categorical(self):
@@ -85,7 +85,7 @@ class TestDataFrameCreateFields(unittest.TestCase):
                                                  {'foo': 0, 'bar': 1, 'boo': 2})
             a.data.write(values)
 
-            total = np.sum(a.data[:])
+            total = a.data.sum()
             self.assertEqual(99987985, total)
 
     def test_dataframe_create_fixed_string(self):
@@ -95,14 +95,21 @@ class TestDataFrameCreateFields(unittest.TestCase):
             hf = dst.create_dataframe('dst')
             np.random.seed(12345678)
             values = np.random.randint(low=0, high=4, size=1000000)
-            svalues = [b''.join([b'x'] * v) for v in values]
+            svalues = np.char.multiply(np.array([b'x'], dtype='S1'), values).astype('S8')
             a = hf.create_fixed_string('a', 8)
             a.data.write(svalues)
 
-            total = np.unique(a.data[:])
+            total = a.data.unique()
             self.assertListEqual([b'', b'x', b'xx', b'xxx'], total.tolist())
 
-            a.data[:] = np.core.defchararray.add(a.data[:], b'y')
+            # append b'y' in place, at the first null byte of each row; full rows are left as
+            # they are, as adding to them and writing them back would truncate the b'y' anyway
+            strs = a.data[:]
+            raw = strs.view(np.uint8).reshape(-1, strs.dtype.itemsize)
+            lengths = np.count_nonzero(raw, axis=1)
+            rows = np.flatnonzero(lengths < raw.shape[1])
+            raw[rows, lengths[rows]] = ord('y')
+            a.data[:] = strs
             self.assertListEqual(
                 [b'xxxy', b'xxy', b'xxxy', b'y', b'xy', b'y', b'xxxy', b'xxxy', b'xy', b'y'],
                 a.data[:10].tolist())
@@ -115,20 +122,14 @@ class TestDataFrameCreateFields(unittest.TestCase):
             hf = dst.create_dataframe('dst')
             np.random.seed(12345678)
             values = np.random.randint(low=0, high=4, size=200000)
-            svalues = [''.join(['x'] * v) for v in values]
+            svalues = np.char.multiply('x', values)
             a = hf.create_indexed_string('a', 8)
             a.data.write(svalues)
 
             total = np.unique(a.data[:])
             self.assertListEqual(['', 'x', 'xx', 'xxx'], total.tolist())
 
-            strs = a.data[:]
-            strs = [s + 'y' for s in strs]
-            a.data.clear()
-            a.data.write(strs)
-
-            self.assertListEqual(
-                ['xxxy', 'xxy', 'xxxy', 'y', 'xy', 'y', 'xxxy', 'xxxy', 'xy', 'y'], strs[:10])
+            a.append_suffix('y')
             self.assertListEqual([0, 4, 7, 11, 12, 14, 15, 19, 23, 25],
                                  a.indices[:10].tolist())
             self.assertListEqual(
@@ -165,6 +166,19 @@ class TestDataFrameCreateFields(unittest.TestCase):
             df['num10'] = df['num'] % df['num2']
             self.assertEqual([0, 0, 0, 0], df['num10'].data[:].tolist())
 
+            with s.fused_ops():
+                df['num11'] = (num + num2) * num2 - 1
+            self.assertEqual([1, 7, 17, 31], df['num11'].data[:].tolist())
+            self.assertEqual([1, 2, 3, 4], num.data[:].tolist())
+
+            with s.fused_ops():
+                c = num + num2
+                d = c * 2
+                e = (c - num2) * num2
+            self.assertEqual([2, 4, 6, 8], c.data[:].tolist())
+            self.assertEqual([4, 8, 12, 16], d.data[:].tolist())
+            self.assertEqual([1, 4, 9, 16], e.data[:].tolist())
+
 
     def test_dataframe_create_mem_categorical(self):
         bio = BytesIO()
@@ -231,6 +245,24 @@ class TestDataFrameCreateFields(unittest.TestCase):
             self.assertEqual([b'e', b'd', b'a'], ddf['fst'].data[:].tolist())
 
 
+    def test_dataframe_drop_many(self):
+        bio = BytesIO()
+        with session.Session() as s:
+            dst = s.open_dataset(bio, 'w', 'dst')
+            df = dst.create_dataframe('df')
+            for n in ('fa', 'fb', 'fc', 'fd'):
+                df.create_numeric(n, 'int32').data.write([1, 2, 3])
+            with self.assertRaises(ValueError):
+                df.drop_many(['fa', 'fz'])
+            self.assertListEqual(['fa', 'fb', 'fc', 'fd'], list(df.keys()))
+
+            fb = df['fb']
+            df.drop_many(['fa', 'fb', 'fd'])
+            self.assertListEqual(['fc'], list(df.keys()))
+            self.assertListEqual(['fc'], list(df.h5group.keys()))
+            self.assertFalse(df.contains_field(fb))
+
+
 class TestDataFrameRename(unittest.TestCase):
 
     def test_rename_1(self):
@@ -334,6 +366,28 @@ class TestDataFrameCopyMove(unittest.TestCase):
                 _ = fa.name
             self.assertEqual('fc', fc.name)
             self.assertEqual('fb', df1['fb'].name)
+            self.assertFalse('fa' in df1)
+            self.assertFalse('fa' in df1.h5group)
+            self.assertListEqual(sa.tolist(), df2['fc'].data[:].tolist())
+
+    def test_add_and_copy_indexed_field(self):
+
+        sa = ['a', 'bb', '', 'ccc', 'dddd']
+
+        bio = BytesIO()
+        with session.Session() as s:
+            ds = s.open_dataset(bio, 'w', 'ds')
+            df1 = ds.create_dataframe('df1')
+            df1.create_indexed_string('fa').data.write(sa)
+            df2 = ds.create_dataframe('df2')
+            df2.add(df1['fa'])
+            df2['fb'] = df1['fa']
+            fc = dataframe.copy(df1['fa'], df2, 'fc')
+            self.assertListEqual(sa, df2['fa'].data[:])
+            self.assertListEqual(sa, df2['fb'].data[:])
+            self.assertListEqual(sa, fc.data[:])
+            self.assertListEqual(df1['fa'].indices[:].tolist(), fc.indices[:].tolist())
+            self.assertListEqual(sa, df1['fa'].data[:])
 
 
 class TestDataFrameApplyFilter(unittest.TestCase):
@@ -358,6 +412,24 @@ class TestDataFrameApplyFilter(unittest.TestCase):
             df.apply_filter(filt)
             self.assertListEqual(expected, df['numf'].data[:].tolist())
 
+    def test_apply_filter_mixed_fields(self):
+        src = np.array([1, 2, 3, 4, 5, 6, 7, 8], dtype='int32')
+        ssrc = ['a', 'bb', '', 'ccc', 'dd', 'e', '', 'ffff']
+        filt = np.array([0, 1, 0, 1, 0, 1, 1, 0], dtype='bool')
+
+        bio = BytesIO()
+        with session.Session() as s:
+            dst = s.open_dataset(bio, 'w', 'dst')
+            df = dst.create_dataframe('df')
+            df.create_numeric('numf', 'int32').data.write(src)
+            df.create_indexed_string('strf').data.write(ssrc)
+            df2 = df.apply_filter(filt, dst.create_dataframe('df2'))
+            self.assertListEqual(src[filt].tolist(), df2['numf'].data[:].tolist())
+            self.assertListEqual(['bb', 'ccc', 'e', ''], df2['strf'].data[:])
+
+            with self.assertRaises(ValueError):
+                df.apply_filter(filt[:-1])
+
 
 class TestDataFrameMerge(unittest.TestCase):
 
@@ -383,6 +455,62 @@ class TestDataFrameMerge(unittest.TestCase):
                              np.logical_not(ddf['valid_r'].data[:])
             self.assertTrue(np.all(valid_if_equal))
 
+    def tests_merge_inner_one_to_one_indexed(self):
+
+        l_id = np.asarray([3, 1, 2, 0], dtype='int32')
+        r_id = np.asarray([0, 1, 2, 3], dtype='int32')
+        l_vals = ['ddd', 'b', 'cc', '']
+        r_vals = ['w', '', 'yyy', 'zzzz']
+
+        bio = BytesIO()
+        with session.Session() as s:
+            dst = s.open_dataset(bio, 'w', 'dst')
+            ldf = dst.create_dataframe('ldf')
+            rdf = dst.create_dataframe('rdf')
+            ldf.create_numeric('l_id', 'int32').data.write(l_id)
+            ldf.create_indexed_string('l_vals').data.write(l_vals)
+            rdf.create_numeric('r_id', 'int32').data.write(r_id)
+            rdf.create_indexed_string('r_vals').data.write(r_vals)
+            ddf = dst.create_dataframe('ddf')
+            dataframe.merge(ldf, rdf, ddf, 'l_id', 'r_id', how='inner')
+            self.assertListEqual(ddf['l_id'].data[:].tolist(), ddf['r_id'].data[:].tolist())
+            expected = {3: ('ddd', 'zzzz'), 1: ('b', ''), 2: ('cc', 'yyy'), 0: ('', 'w')}
+            actual = zip(ddf['l_id'].data[:].tolist(), ddf['l_vals'].data[:],
+                         ddf['r_vals'].data[:])
+            self.assertDictEqual(expected, {k: (l, r) for k, l, r in actual})
+
+    def tests_merge_reuse_merge_maps(self):
+
+        l_id = np.asarray([0, 1, 2, 3, 4], dtype='int32')
+        r_id = np.asarray([2, 3, 0, 2], dtype='int32')
+
+        bio = BytesIO()
+        with session.Session() as s:
+            dst = s.open_dataset(bio, 'w', 'dst')
+            ldf = dst.create_dataframe('ldf')
+            rdf = dst.create_dataframe('rdf')
+            ldf.create_numeric('l_id', 'int32').data.write(l_id)
+            rdf.create_numeric('r_id', 'int32').data.write(r_id)
+            rdf.create_numeric('r_a', 'int32').data.write([10, 20, 30, 40])
+            rdf.create_numeric('r_b', 'int32').data.write([1, 2, 3, 4])
+
+            with s.reuse_merge_maps():
+                ddf1 = dst.create_dataframe('ddf1')
+                dataframe.merge(ldf, rdf, ddf1, 'l_id', 'r_id', right_fields=['r_a'], how='left')
+                self.assertEqual(1, len(s._merge_maps))
+                ddf2 = dst.create_dataframe('ddf2')
+                dataframe.merge(ldf, rdf, ddf2, 'l_id', 'r_id', right_fields=['r_b'], how='left')
+                self.assertEqual(1, len(s._merge_maps))
+            self.assertIsNone(s._merge_maps)
+            self.assertListEqual([30, 0, 10, 40, 20, 0], ddf1['r_a'].data[:].tolist())
+            self.assertListEqual([3, 0, 1, 4, 2, 0], ddf2['r_b'].data[:].tolist())
+
+            rdf['r_id'].data.clear()
+            rdf['r_id'].data.write(np.asarray([4, 3, 2, 1], dtype='int32'))
+            ddf3 = dst.create_dataframe('ddf3')
+            dataframe.merge(ldf, rdf, ddf3, 'l_id', 'r_id', right_fields=['r_b'], how='left')
+            self.assertListEqual([0, 4, 3, 2, 1], ddf3['r_b'].data[:].tolist())
+
     def tests_merge_right(self):
 
         r_id = np.asarray([0, 1, 2, 3, 4, 5, 6, 7], dtype='int32')
@@ -411,8 +539,8 @@ class TestDataFrameMerge(unittest.TestCase):
         l_id = np.asarray([2, 3, 0, 4, 7, 6, 2, 0, 3], dtype='int32')
         r_vals = ['zero', 'one', 'two', 'three', 'four', 'five', 'six', 'seven']
         l_vals = ['bb1', 'ccc1', '', 'dddd1', 'ggggggg1', 'ffffff1', 'bb2', '', 'ccc2']
-        expected_left = ['bb1', 'bb2', 'ccc1', 'ccc2', '', '', 'dddd1', 'ggggggg1', 'ffffff1']
-        expected_right = ['two', 'two', 'three', 'three', 'zero', 'zero', 'four', 'seven', 'six']
+        expected_left = ['bb1', 'ccc1', '', 'dddd1', 'ggggggg1', 'ffffff1', 'bb2', '', 'ccc2']
+        expected_right = ['two', 'three', 'zero', 'four', 'seven', 'six', 'two', 'zero', 'three']
 
         bio = BytesIO()
         with session.Session() as s:
@@ -434,10 +562,10 @@ class TestDataFrameMerge(unittest.TestCase):
         l_id = np.asarray([2, 3, 0, 4, 7, 6, 2, 0, 3], dtype='int32')
         r_vals = ['zero', 'one', 'two', 'three', 'four', 'five', 'six', 'seven']
         l_vals = ['bb1', 'ccc1', '', 'dddd1', 'ggggggg1', 'ffffff1', 'bb2', '', 'ccc2']
-        expected_left = ['bb1', 'bb2', 'ccc1', 'ccc2', '', '', 'dddd1', 'ggggggg1', 'ffffff1',
-                         '', '']
-        expected_right = ['two', 'two', 'three', 'three', 'zero', 'zero', 'four', 'seven', 'six',
-                          'one', 'five']
+        expected_left = ['', '', '', 'bb1', 'bb2', 'ccc1', 'ccc2', 'dddd1', '', 'ffffff1',
+                         'ggggggg1']
+        expected_right = ['zero', 'zero', 'one', 'two', 'two', 'three', 'three', 'four', 'five',
+                          'six', 'seven']
 
         bio = BytesIO()
         with session.Session() as s:
@@ -482,3 +610,42 @@ class TestDataFrameMerge(unittest.TestCase):
             self.assertEqual(ddf['l_id_1'].data[:].tolist(), ddf['r_id_1'].data[:].tolist())
             self.assertEqual(ddf['r_id_2'].data[:].tolist(), ddf['r_id_2'].data[:].tolist())
 
+
+    def tests_merge_left_categorical_key(self):
+
+        l_id = np.asarray([0, 1, 2, 1, 0], dtype='int8')
+        r_id = np.asarray([2, 1, 0], dtype='int8')
+        r_vals = ['baz', 'foo', 'qux']
+        expected = ['foo', '', 'qux', '', 'foo']
+
+        bio = BytesIO()
+        with session.Session() as s:
+            dst = s.open_dataset(bio, 'w', 'dst')
+            ldf = dst.create_dataframe('ldf')
+            rdf = dst.create_dataframe('rdf')
+            ldf.create_categorical('l_id', 'int8', {'a': 0, 'b': 1, 'c': 2}).data.write(l_id)
+            rdf.create_categorical('r_id', 'int8', {'c': 0, 'a': 1, 'd': 2}).data.write(r_id)
+            rdf.create_indexed_string('r_vals').data.write(r_vals)
+            ddf = dst.create_dataframe('ddf')
+            dataframe.merge(ldf, rdf, ddf, 'l_id', 'r_id', how='left')
+            self.assertEqual(expected, ddf['r_vals'].data[:])
+            self.assertEqual([True, False, True, False, True], ddf['valid_r'].data[:].tolist())
+
+    def tests_merge_inner_fixed_string_key(self):
+
+        l_id = np.asarray([b'b', b'a', b'c', b'b'], dtype='S1')
+        r_id = np.asarray([b'a', b'b', b'b', b'd'], dtype='S1')
+        r_vals = np.asarray([1, 2, 3, 4], dtype='int32')
+
+        bio = BytesIO()
+        with session.Session() as s:
+            dst = s.open_dataset(bio, 'w', 'dst')
+            ldf = dst.create_dataframe('ldf')
+            rdf = dst.create_dataframe('rdf')
+            ldf.create_fixed_string('l_id', 1).data.write(l_id)
+            rdf.create_fixed_string('r_id', 1).data.write(r_id)
+            rdf.create_numeric('r_vals', 'int32').data.write(r_vals)
+            ddf = dst.create_dataframe('ddf')
+            dataframe.merge(ldf, rdf, ddf, 'l_id', 'r_id', how='inner')
+            self.assertEqual([b'b', b'b', b'a', b'b', b'b'], ddf['l_id'].data[:].tolist())
+            self.assertEqual([2, 3, 1, 2, 3], ddf['r_vals'].data[:].tolist())
@@ -1,4 +1,5 @@
 import unittest
+from unittest import mock
 
 import numpy as np
 from io import BytesIO
@@ -218,6 +219,53 @@ class TestIndexedStringFields(unittest.TestCase):
             idx.data.write(['aa', 'bb', 'bb', 'c', 'c', 'c', 'ddd', 'ddd', 'e', 'f', 'f', 'f'])
             self.assertListEqual([0, 1, 3, 6, 8, 9, 12], s.get_spans(idx))
 
+    def test_indexed_string_slices(self):
+        bio = BytesIO()
+        with session.Session() as s:
+            dst = s.open_dataset(bio, "w", "src")
+            hf = dst.create_dataframe('src')
+            strings = ['a', 'bb', 'ccc', '', 'ddé', '€']
+            f = s.create_indexed_string(hf, 'foo')
+            f.data.write(strings)
+            self.assertListEqual(strings, f.data[:])
+            self.assertListEqual(strings[2:], f.data[2:])
+            self.assertListEqual(strings[1:4], f.data[1:4])
+            self.assertListEqual(['a', 'bb', 'ccc'], f.data[:3])
+            f = s.get(hf['foo'])
+            self.assertListEqual(strings[3:], f.data[3:])
+            self.assertListEqual([], f.data[2:2])
+
+    def test_indexed_string_item_pages(self):
+        data = ['a', '', 'bb', 'ccc', 'd', 'ee', '', 'f']
+        bio = BytesIO()
+        with mock.patch.object(fields, 'INDEX_PAGE_LENGTH', 3), session.Session() as s:
+            ds = s.open_dataset(bio, 'w', 'ds')
+            df = ds.create_dataframe('df')
+            f = df.create_indexed_string('foo')
+            f.data.write(data)
+            ro = s.get(df['foo'])
+            for d in (f.data, ro.data):
+                self.assertListEqual(data, [d[i] for i in range(len(data))])
+                self.assertListEqual(data[::-1], [d[i] for i in reversed(range(len(data)))])
+            f.data.write(['gg'])
+            self.assertEqual('gg', ro.data[8])
+            f.data.clear()
+            f.data.write(data[::-1] + ['h'])
+            self.assertListEqual(data[::-1], [f.data[i] for i in range(len(data))])
+
+    def test_indexed_string_clear_discards_buffered_part(self):
+        bio = BytesIO()
+        with session.Session() as s:
+            dst = s.open_dataset(bio, "w", "src")
+            hf = dst.create_dataframe('src')
+            f = s.create_indexed_string(hf, 'foo')
+            f.data.write(['a', 'bb'])
+            f.data.write_part(['zz'])
+            f.data.clear()
+            f.data.write(['c', 'dd'])
+            self.assertListEqual(['c', 'dd'], f.data[:])
+            self.assertListEqual([0, 1, 3], f.indices[:].tolist())
+
 
 
 
@@ -244,6 +292,116 @@ class TestFieldArray(unittest.TestCase):
         num.data.clear()
         self.assertListEqual([], list(num.data[:]))
 
+    def test_setitem_all(self):
+        bio = BytesIO()
+        s = session.Session()
+        ds = s.open_dataset(bio, "w", "src")
+        dst = ds.create_dataframe('src')
+        num = s.create_numeric(dst, 'num', 'int32')
+        num.data.write(np.zeros(10, dtype=np.int32))
+        num.data[:] = np.arange(10, dtype=np.int32)
+        self.assertListEqual(list(range(10)), num.data[:].tolist())
+        num.data[:] = np.arange(20, 0, -2, dtype=np.int64)
+        self.assertListEqual(list(range(20, 0, -2)), num.data[:].tolist())
+        num.data[:] = np.arange(20, dtype=np.int32)[::2]
+        self.assertListEqual(list(range(0, 20, 2)), num.data[:].tolist())
+
+    def test_read_all(self):
+        bio = BytesIO()
+        s = session.Session()
+        ds = s.open_dataset(bio, "w", "src")
+        dst = ds.create_dataframe('src')
+        length = fields.READ_DIRECT_MIN_LENGTH + 1
+        num = s.create_numeric(dst, 'num', 'int32')
+        num.data.write(np.arange(length))
+        fxd = s.create_fixed_string(dst, 'fxd', 2)
+        fxd.data.write(np.full(length, b'ab'))
+        for f in (num, fxd, s.get(dst['num'])):
+            self.assertTrue(np.array_equal(f.data[:], f.data[0:length]))
+        filt = np.arange(length) % 3 == 0
+        self.assertListEqual(list(np.arange(length)[filt]), list(num.apply_filter(filt).data[:]))
+
+    def test_read_slice_after_write(self):
+        bio = BytesIO()
+        with session.Session() as s:
+            ds = s.open_dataset(bio, "w", "src")
+            dst = ds.create_dataframe('src')
+            num = s.create_numeric(dst, 'num', 'int32')
+            num.data.write_part(np.arange(5))
+            ro = s.get(dst['num'])
+            self.assertListEqual([3, 4], ro.data[3:8].tolist())
+            num.data.write_part(np.arange(5))
+            self.assertListEqual([3, 4, 0, 1, 2], ro.data[3:8].tolist())
+            self.assertListEqual([3, 4, 0, 1, 2], num.data[3:8].tolist())
+            num.data.clear()
+            self.assertListEqual([], num.data[3:8].tolist())
+
+    def test_read_slice_without_h5py_reader(self):
+        bio = BytesIO()
+        with mock.patch.object(fields, '_H5Reader', None), session.Session() as s:
+            ds = s.open_dataset(bio, "w", "src")
+            dst = ds.create_dataframe('src')
+            num = s.create_numeric(dst, 'num', 'int32')
+            num.data.write_part(np.arange(5))
+            self.assertListEqual([1, 2, 3], num.data[1:4].tolist())
+            self.assertListEqual([3, 4], num.data[3:8].tolist())
+            self.assertListEqual([0, 2, 4], num.data[::2].tolist())
+            self.assertListEqual([], num.data[4:2].tolist())
+            num.data.write_part(np.arange(5))
+            self.assertListEqual([3, 4, 0, 1, 2], num.data[3:8].tolist())
+
+    def test_inplace_apply(self):
+        bio = BytesIO()
+        with mock.patch.object(fields.ops, 'DEFAULT_CHUNKSIZE', 3), session.Session() as s:
+            ds = s.open_dataset(bio, "w", "src")
+            dst = ds.create_dataframe('src')
+            num = s.create_numeric(dst, 'num', 'int32')
+            num.data.write(np.arange(8))
+            num.data.inplace_apply(np.multiply, 3)
+            self.assertListEqual([0, 3, 6, 9, 12, 15, 18, 21], num.data[:].tolist())
+            with self.assertRaises(PermissionError):
+                fields.NumericField(s, dst.h5group['num'], dst).data.inplace_apply(np.add, 1)
+
+            mem = fields.NumericMemField(s, 'int32')
+            mem.data.write(np.arange(4, dtype=np.int32))
+            mem.data.inplace_apply(np.add, 1)
+            self.assertListEqual([1, 2, 3, 4], mem.data[:].tolist())
+
+    def test_streamed_sum_and_unique(self):
+        bio = BytesIO()
+        with mock.patch.object(fields.ops, 'DEFAULT_CHUNKSIZE', 3), session.Session() as s:
+            ds = s.open_dataset(bio, "w", "src")
+            dst = ds.create_dataframe('src')
+            num = s.create_numeric(dst, 'num', 'int32')
+            num.data.write(np.array([5, 1, 5, 2, 8, 1, 2, 9], dtype=np.int32))
+            self.assertEqual(33, num.data.sum())
+            self.assertListEqual([1, 2, 5, 8, 9], num.data.unique().tolist())
+            ro = fields.NumericField(s, dst.h5group['num'], dst)
+            self.assertEqual(33, ro.data.sum())
+            self.assertListEqual([1, 2, 5, 8, 9], ro.data.unique().tolist())
+
+            empty = s.create_numeric(dst, 'empty', 'int32')
+            self.assertEqual(0, empty.data.sum())
+            self.assertListEqual([], empty.data.unique().tolist())
+
+            mem = fields.NumericMemField(s, 'int32')
+            mem.data.write(np.array([3, 1, 3], dtype=np.int32))
+            self.assertEqual(7, mem.data.sum())
+            self.assertListEqual([1, 3], mem.data.unique().tolist())
+
+    def test_complete_marks_dataset(self):
+        bio = BytesIO()
+        with session.Session() as s:
+            ds = s.open_dataset(bio, "w", "src")
+            dst = ds.create_dataframe('src')
+            num = s.create_numeric(dst, 'num', 'int32')
+            num.data.write(np.arange(5))
+            self.assertTrue(dst['num'].data._dataset.attrs['completed'])
+            num.data.clear()
+            self.assertNotIn('completed', dst['num'].data._dataset.attrs)
+            num.data.write(np.arange(5))
+            self.assertTrue(dst['num'].data._dataset.attrs['completed'])
+
 
 class TestMemoryFieldCreateLike(unittest.TestCase):
 
@@ -526,6 +684,28 @@ class TestMemoryFields(unittest.TestCase):
 
 class TestFieldApplyFilter(unittest.TestCase):
 
+    def test_numeric_apply_filter_streamed(self):
+        data = np.arange(10, dtype=np.int32)
+        filt = np.array([1, 1, 0, 1, 0, 0, 1, 0, 1, 1], dtype=bool)
+        expected = data[filt].tolist()
+
+        bio = BytesIO()
+        with mock.patch.object(fields, 'FILTER_STREAM_LENGTH', 3), session.Session() as s:
+            ds = s.open_dataset(bio, 'w', 'ds')
+            df = ds.create_dataframe('df')
+            f = df.create_numeric('foo', 'int32')
+            f.data.write(data)
+
+            self.assertListEqual(expected, f.apply_filter(filt).data[:].tolist())
+            g = f.create_like(df, 'g')
+            f.apply_filter(filt, target=g)
+            self.assertListEqual(expected, df['g'].data[:].tolist())
+            h = f.create_like(df, 'h')
+            h.data.write(np.zeros(len(expected), dtype=np.int32))
+            f.apply_filter(filt, target=h)
+            self.assertListEqual(expected, df['h'].data[:].tolist())
+            self.assertListEqual(data.tolist(), f.data[:].tolist())
+
     def test_indexed_string_apply_filter(self):
 
         data = ['a', 'bb', 'ccc', 'dddd', '', 'eeee', 'fff', 'gg', 'h']
@@ -876,6 +1056,19 @@ class TestFieldApplyIndex(unittest.TestCase):
             mb = b.apply_index(indices)
             self.assertListEqual(expected, mb.data[:].tolist())
 
+    def test_numeric_apply_index_runs(self):
+        data = np.arange(20, dtype=np.int32)
+        indices = np.array([12, 13, 14, 2, 3], dtype=np.int64)
+        bio = BytesIO()
+        with mock.patch.object(fields, 'INDEX_RUN_READ_MIN_LENGTH', 2), session.Session() as s:
+            ds = s.open_dataset(bio, 'w', 'ds')
+            df = ds.create_dataframe('df')
+            f = df.create_numeric('foo', 'int32')
+            f.data.write(data)
+            self.assertListEqual([12, 13, 14, 2, 3], f.apply_index(indices).data[:].tolist())
+            with self.assertRaises(IndexError):
+                f.apply_index(np.array([18, 19, 20, 21, 22], dtype=np.int64))
+
     def test_numeric_apply_index(self):
         data = np.array([1, 2, 3, 4, 5, 6, 7, 8, 9], dtype='int32')
         indices = np.array([8, 0, 7, 1, 6, 2, 5, 3, 4], dtype=np.int32)
@@ -57,6 +57,24 @@ class TestSafeMap(unittest.TestCase):
             np.asarray([1, 8, 2, 7, ops.INVALID_INDEX, 0, 9, 1, 8]),
             np.asarray([3, 45, 6, 36, 0, 1, 55, 3, 45]), 0)
 
+    def test_map_indexed_values_no_mask(self):
+        indices = np.asarray([0, 1, 3, 6, 10, 15, 15, 20, 24, 27, 29, 30], dtype=np.int32)
+        values = np.frombuffer(b'abbcccddddeeeeeggggghhhhiiijjk', dtype='S1')
+        map_indices = np.asarray([0, 4, 10, 8, 5, 2, 1, 6, 9])
+        actual_indices, actual_values =\
+            ops.map_indexed_values_no_mask(indices, values, map_indices)
+        expected_indices, expected_values =\
+            ops.safe_map_indexed_values(indices, values, map_indices,
+                                        np.ones(len(map_indices), dtype=bool))
+        self.assertTrue(np.array_equal(actual_indices, expected_indices))
+        self.assertTrue(np.array_equal(actual_values, expected_values))
+
+    def test_map_values_no_mask(self):
+        values = np.asarray([1, 3, 6, 10, 15, 21, 28, 36, 45, 55])
+        map_indices = np.asarray([1, 8, 2, 7, 0, 9, 1, 8])
+        self.assertListEqual([3, 45, 6, 36, 1, 55, 3, 45],
+                             ops.map_values_no_mask(values, map_indices).tolist())
+
 
 class TestAggregation(unittest.TestCase):
 
@@ -516,6 +534,21 @@ class TestAggregation(unittest.TestCase):
             self.assertEqual([7, 6], list(dict.values()))
 
 
+class TestAppendSuffix(unittest.TestCase):
+
+    def test_append_suffix_to_index_values(self):
+        indices = np.asarray([0, 1, 1, 4, 6], dtype=np.int64)
+        values = np.frombuffer(b'abbbcc', dtype=np.uint8)
+        actual_indices, actual_values = ops.append_suffix_to_index_values(b'yz', indices, values)
+        self.assertListEqual([0, 3, 5, 10, 14], actual_indices.tolist())
+        self.assertEqual(b'ayzyzbbbyzccyz', actual_values.tobytes())
+
+        actual_indices, actual_values = ops.append_suffix_to_index_values(
+            b'y', np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.uint8))
+        self.assertListEqual([], actual_indices.tolist())
+        self.assertListEqual([], actual_values.tolist())
+
+
 class TestGetSpans(unittest.TestCase):
 
     def test_get_spans_two_field(self):
@@ -530,3 +563,104 @@ class TestGetSpans(unittest.TestCase):
         self.assertTrue(list(spans), list(spans3))
 
 
+
+
+class TestGenerateMergeMaps(unittest.TestCase):
+
+    def test_generate_merge_maps_left(self):
+        l_id = np.asarray([3, 1, 3, 2, 5, 1], dtype=np.int32)
+        r_id = np.asarray([1, 3, 4, 1, 3, 6], dtype=np.int32)
+        l_map, l_filt, r_map, r_filt = ops.generate_merge_maps(l_id, r_id, 'left')
+        self.assertListEqual([0, 0, 1, 1, 2, 2, 3, 4, 5, 5], l_map.tolist())
+        self.assertTrue(np.all(l_filt))
+        self.assertListEqual([1, 4, 0, 3, 1, 4, 0, 3], r_map[r_filt].tolist())
+        self.assertListEqual([True] * 6 + [False, False] + [True] * 2, r_filt.tolist())
+
+    def test_generate_merge_maps_right(self):
+        l_id = np.asarray([3, 1, 3, 2, 5, 1], dtype=np.int32)
+        r_id = np.asarray([1, 3, 4, 1, 3, 6], dtype=np.int32)
+        l_map, l_filt, r_map, r_filt = ops.generate_merge_maps(l_id, r_id, 'right')
+        self.assertListEqual([0, 0, 1, 1, 2, 3, 3, 4, 4, 5], r_map.tolist())
+        self.assertTrue(np.all(r_filt))
+        self.assertListEqual([1, 5, 0, 2, 1, 5, 0, 2], l_map[l_filt].tolist())
+
+    def test_generate_merge_maps_inner(self):
+        l_id = np.asarray([3, 1, 3, 2, 5, 1], dtype=np.int32)
+        r_id = np.asarray([1, 3, 4, 1, 3, 6], dtype=np.int32)
+        l_map, l_filt, r_map, r_filt = ops.generate_merge_maps(l_id, r_id, 'inner')
+        self.assertListEqual([0, 0, 1, 1, 2, 2, 5, 5], l_map.tolist())
+        self.assertListEqual([1, 4, 0, 3, 1, 4, 0, 3], r_map.tolist())
+        self.assertTrue(np.all(l_filt) and np.all(r_filt))
+
+    def test_generate_merge_maps_outer(self):
+        l_id = np.asarray([3, 1, 3, 2, 5, 1], dtype=np.int32)
+        r_id = np.asarray([1, 3, 4, 1, 3, 6], dtype=np.int32)
+        l_map, l_filt, r_map, r_filt = ops.generate_merge_maps(l_id, r_id, 'outer')
+        self.assertListEqual([1, 1, 5, 5, 3, 0, 0, 2, 2, 4], l_map[l_filt].tolist())
+        self.assertListEqual([True] * 9 + [False, True, False], l_filt.tolist())
+        self.assertListEqual([0, 3, 0, 3, 1, 4, 1, 4, 2, 5], r_map[r_filt].tolist())
+        self.assertListEqual([True] * 4 + [False] + [True] * 5 + [False, True], r_filt.tolist())
+
+    def test_generate_merge_maps_matches_pandas_order(self):
+        import pandas as pd
+        l_id_1 = np.asarray([3, 1, 3, 2, 5, 1, 7, 3], dtype=np.int64)
+        l_id_2 = np.asarray([0, 1, 1, 0, 0, 1, 0, 0], dtype=np.int64)
+        r_id_1 = np.asarray([1, 3, 4, 1, 3, 6, 0, 3], dtype=np.int64)
+        r_id_2 = np.asarray([1, 0, 0, 1, 1, 0, 0, 0], dtype=np.int64)
+        l_df = pd.DataFrame({'k1': l_id_1, 'k2': l_id_2, 'l_i': np.arange(len(l_id_1))})
+        r_df = pd.DataFrame({'k1': r_id_1, 'k2': r_id_2, 'r_i': np.arange(len(r_id_1))})
+        for on, l_keys, r_keys in ((['k1'], l_id_1, r_id_1),
+                                   (['k1', 'k2'], (l_id_1, l_id_2), (r_id_1, r_id_2))):
+            for how in ('left', 'right', 'inner', 'outer'):
+                expected = pd.merge(l_df, r_df, on=on, how=how)
+                l_map, l_filt, r_map, r_filt = ops.generate_merge_maps(l_keys, r_keys, how)
+                for e, d_map, d_filt in ((expected['l_i'], l_map, l_filt),
+                                         (expected['r_i'], r_map, r_filt)):
+                    self.assertListEqual(e.notnull().tolist(), d_filt.tolist())
+                    self.assertListEqual(e[e.notnull()].astype(np.int64).tolist(),
+                                         d_map[d_filt].tolist())
+
+    def test_generate_merge_maps_fixed_string(self):
+        for dtype in ('S3', 'S16'):
+            names = {1: b'a', 2: b'bb', 3: b'ccc', 4: b'a\x01', 5: b'bc', 6: b'b'}
+            l_id = np.asarray([names[i] for i in (3, 1, 3, 2, 5, 1)], dtype=dtype)
+            r_id = np.asarray([names[i] for i in (1, 3, 4, 1, 3, 6)], dtype=dtype)
+            l_map, l_filt, r_map, r_filt = ops.generate_merge_maps(l_id, r_id, 'inner')
+            self.assertListEqual([0, 0, 1, 1, 2, 2, 5, 5], l_map.tolist())
+            self.assertListEqual([1, 4, 0, 3, 1, 4, 0, 3], r_map.tolist())
+
+    def test_generate_merge_maps_sorted_unique(self):
+        l_id = np.asarray([1, 2, 4, 5, 7], dtype=np.int32)
+        r_id = np.asarray([2, 3, 5, 8], dtype=np.int32)
+        l_map, l_filt, r_map, r_filt = ops.generate_merge_maps(l_id, r_id, 'inner')
+        self.assertListEqual([1, 3], l_map.tolist())
+        self.assertListEqual([0, 2], r_map.tolist())
+
+        l_map, l_filt, r_map, r_filt = ops.generate_merge_maps(l_id, r_id, 'right')
+        self.assertListEqual([1, 3], l_map[l_filt].tolist())
+        self.assertListEqual([True, False, True, False], l_filt.tolist())
+        self.assertListEqual([0, 1, 2, 3], r_map.tolist())
+
+        l_map, l_filt, r_map, r_filt = ops.generate_merge_maps(l_id, r_id, 'outer')
+        self.assertListEqual([0, 1, 2, 3, 4], l_map[l_filt].tolist())
+        self.assertListEqual([True, True, False, True, True, True, False], l_filt.tolist())
+        self.assertListEqual([0, 1, 2, 3], r_map[r_filt].tolist())
+        self.assertListEqual([False, True, True, False, True, False, True], r_filt.tolist())
+
+        l_map, l_filt, r_map, r_filt = ops.generate_merge_maps(np.asarray([1, 3]),
+                                                               np.asarray([2, 3]), 'outer')
+        self.assertListEqual([True, False, True], l_filt.tolist())
+        self.assertListEqual([0, 1], l_map[l_filt].tolist())
+        self.assertListEqual([False, True, True], r_filt.tolist())
+        self.assertListEqual([0, 1], r_map[r_filt].tolist())
+
+    def test_generate_merge_maps_compound_key(self):
+        l_id_1 = np.asarray([0, 0, 1, 1], dtype=np.int32)
+        l_id_2 = np.asarray([0, 1, 0, 1], dtype=np.int32)
+        r_id_1 = np.asarray([1, 0, 1, 0], dtype=np.int32)
+        r_id_2 = np.asarray([1, 1, 0, 2], dtype=np.int32)
+        l_map, l_filt, r_map, r_filt = ops.generate_merge_maps((l_id_1, l_id_2),
+                                                               (r_id_1, r_id_2), 'left')
+        self.assertListEqual([0, 1, 2, 3], l_map.tolist())
+        self.assertListEqual([False, True, True, True], r_filt.tolist())
+        self.assertListEqual([1, 2, 0], r_map[r_filt].tolist())
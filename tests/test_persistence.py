@@ -447,6 +447,36 @@ class TestPersistence(unittest.TestCase):
             self.assertListEqual([0, 2, 1, 1, 0, 0, 2, 1, 2, 0],
                                  datastore.get_reader(hf['foo'])[:].tolist())
 
+    def test_leaky_categorical_string_importer(self):
+
+        datastore = persistence.DataStore(10)
+        ts = str(datetime.now(timezone.utc))
+        bio = BytesIO()
+        with h5py.File(bio, 'w') as hf:
+            values = np.array(['', 'True', 'maybe', 'False', '', 'no', 'True', 'False'])
+            foo = rw.LeakyCategoricalImporter(datastore, hf, 'foo',
+                                              {'': 0, 'False': 1, 'True': 2}, 'freetext', ts)
+            foo.write(values)
+            self.assertListEqual([0, 2, -1, 1, 0, -1, 2, 1],
+                                 datastore.get_reader(hf['foo'])[:].tolist())
+            self.assertListEqual(['', '', 'maybe', '', '', 'no', '', ''],
+                                 datastore.get_reader(hf['foo_freetext'])[:])
+
+    def test_leaky_categorical_string_importer_many_keys(self):
+
+        datastore = persistence.DataStore(10)
+        ts = str(datetime.now(timezone.utc))
+        bio = BytesIO()
+        with h5py.File(bio, 'w') as hf:
+            keys = {'k{}'.format(i): i % 100 for i in range(300)}
+            values = np.array(['k299', 'zz', 'k0', 'k150', '', 'k42'])
+            foo = rw.LeakyCategoricalImporter(datastore, hf, 'foo', keys, 'freetext', ts)
+            foo.write(values)
+            self.assertListEqual([99, -1, 0, 50, -1, 42],
+                                 datastore.get_reader(hf['foo'])[:].tolist())
+            self.assertListEqual(['', 'zz', '', '', '', ''],
+                                 datastore.get_reader(hf['foo_freetext'])[:])
+
     # def test_categorical_string_writer_with_string_data(self):
     #     datastore = persistence.DataStore(10)
     #     ts = str(datetime.now(timezone.utc))
@@ -508,6 +538,22 @@ class TestPersistence(unittest.TestCase):
             self.assertTrue(np.array_equal(reader[:], reader2[:]))
 
 
+    def test_optional_date_importer(self):
+
+        datastore = persistence.DataStore(10)
+        ts = str(datetime.now(timezone.utc))
+        bio = BytesIO()
+        with h5py.File(bio, 'w') as hf:
+            values = np.array([b'2020-05-10', b'', b'1999-12-31', b'  '], dtype='S10')
+            rw.OptionalDateImporter(datastore, hf, 'foo', True, True, ts).write(values)
+            expected = [datetime(2020, 5, 10).timestamp(), 0,
+                        datetime(1999, 12, 31).timestamp(), 0]
+            self.assertListEqual(expected, datastore.get_reader(hf['foo'])[:].tolist())
+            self.assertListEqual([True, False, True, False],
+                                 datastore.get_reader(hf['foo_set'])[:].tolist())
+            self.assertListEqual([b'2020-05-10', b'', b'1999-12-31', b'  '],
+                                 datastore.get_reader(hf['foo_day'])[:].tolist())
+
     def test_timestamp_reader(self):
 
         datastore = persistence.DataStore(10)
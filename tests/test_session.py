@@ -700,6 +700,31 @@ class TestSessionGetSpans(unittest.TestCase):
             vals_2_f = s.create_numeric(ds, 'vals_2', 'int32')
             vals_2_f.data.write(vals_2)
             self.assertListEqual([0, 2, 3, 5, 6, 8, 12], s.get_spans(fields=(vals_1, vals_2)).tolist())
+            self.assertListEqual([0, 2, 3, 5, 6, 8, 12],
+                                 s.get_spans(fields=(vals_1_f, vals_2_f)).tolist())
+
+    def test_get_spans_three_fields(self):
+        rng = np.random.default_rng(0)
+        vals = [rng.integers(0, 3, 200, dtype=np.int32) for _ in range(3)]
+        order = np.lexsort(vals[::-1])
+        vals = [v[order] for v in vals]
+        changes = np.zeros(len(order) - 1, dtype=bool)
+        for v in vals:
+            changes |= v[1:] != v[:-1]
+        expected = [0] + (np.flatnonzero(changes) + 1).tolist() + [len(order)]
+
+        bio = BytesIO()
+        with session.Session() as s:
+            self.assertListEqual(expected, s.get_spans(fields=tuple(vals)).tolist())
+
+            dst = s.open_dataset(bio, "w", "src")
+            ds = dst.create_dataframe('ds')
+            fields = []
+            for i, v in enumerate(vals):
+                f = s.create_numeric(ds, 'vals_{}'.format(i), 'int32')
+                f.data.write(v)
+                fields.append(f)
+            self.assertListEqual(expected, s.get_spans(fields=tuple(fields)).tolist())
 
     def test_get_spans_index_string_field(self):
         bio=BytesIO()
@@ -1156,6 +1181,78 @@ class TestSessionImporters(unittest.TestCase):
             for i, j in zip(expected, actual):
                 self.assertAlmostEqual(i, j)
 
+    def test_leaky_categorical_importer(self):
+        bio = BytesIO()
+        with session.Session() as s:
+            dst = s.open_dataset(bio, 'r+', 'dst')
+            hf = dst.create_dataframe('hf')
+            values = ['a', 'b', 'c', '', 'b', 'dd', 'a']
+            im = fields.LeakyCategoricalImporter(s, hf, 'x', 'int8', {'': 0, 'a': 1, 'b': 2},
+                                                 'freetext')
+            im.write(values)
+            self.assertListEqual([1, 2, -1, 0, 2, -1, 1], s.get(hf['x']).data[:].tolist())
+            self.assertListEqual(['', '', 'c', '', '', 'dd', ''],
+                                 s.get(hf['x_freetext']).data[:])
+
+            im = fields.LeakyCategoricalImporter(s, hf, 'y', 'int8', {'': 0, 'a': 1, 'b': 2},
+                                                 'freetext')
+            im.write(np.array(values))
+            self.assertListEqual([1, 2, -1, 0, 2, -1, 1], s.get(hf['y']).data[:].tolist())
+            self.assertListEqual(['', '', 'c', '', '', 'dd', ''],
+                                 s.get(hf['y_freetext']).data[:])
+
+    def test_categorical_importer_value_type(self):
+        bio = BytesIO()
+        with session.Session() as s:
+            dst = s.open_dataset(bio, 'r+', 'dst')
+            hf = dst.create_dataframe('hf')
+            im = fields.CategoricalImporter(s, hf, 'x', 'int32', {'a': 1, 'b': 2})
+            im.write(np.array([1, 2, 2], dtype=np.int32))
+            self.assertEqual(np.int8, s.get(hf['x']).data[:].dtype)
+            self.assertListEqual([1, 2, 2], s.get(hf['x']).data[:].tolist())
+
+            im = fields.CategoricalImporter(s, hf, 'y', 'int32', {'a': 1, 'b': 1000})
+            im.write(np.array([1, 1000], dtype=np.int32))
+            self.assertEqual(np.int32, s.get(hf['y']).data[:].dtype)
+            self.assertListEqual([1, 1000], s.get(hf['y']).data[:].tolist())
+
+    def test_datetime_importer(self):
+        from datetime import datetime
+        bio = BytesIO()
+        with session.Session() as s:
+            dst = s.open_dataset(bio, 'r+', 'dst')
+            hf = dst.create_dataframe('hf')
+            values = ['2020-05-10 12:00:00+01:00', '2020-05-12 07:30:00.250000-05:30']
+            im = fields.DateTimeImporter(s, hf, 'x')
+            im.write(values)
+            f = s.get(hf['x'])
+            expected = [datetime.strptime(values[0], '%Y-%m-%d %H:%M:%S%z').timestamp(),
+                        datetime.strptime(values[1], '%Y-%m-%d %H:%M:%S.%f%z').timestamp()]
+            self.assertListEqual(expected, f.data[:].tolist())
+
+            im = fields.DateTimeImporter(s, hf, 'z')
+            chunk = im.chunk_factory(len(values))
+            chunk[:] = values
+            im.write(chunk)
+            self.assertListEqual(expected, s.get(hf['z']).data[:].tolist())
+
+            shared = ['2020-05-10 12:00:00+05:30', '2020-05-12 07:30:00.250000+05:30']
+            fields.DateTimeImporter(s, hf, 'w').write(shared)
+            self.assertListEqual(
+                [datetime.strptime(shared[0], '%Y-%m-%d %H:%M:%S%z').timestamp(),
+                 datetime.strptime(shared[1], '%Y-%m-%d %H:%M:%S.%f%z').timestamp()],
+                s.get(hf['w']).data[:].tolist())
+
+            optional = ['', '2020-05-10 12:00:00+01:00', '']
+            fields.DateTimeImporter(s, hf, 'v', optional=True).write(optional)
+            r = s.get(hf['v']).data[:].tolist()
+            self.assertTrue(np.isnan(r[0]) and np.isnan(r[2]))
+            self.assertEqual(expected[0], r[1])
+            self.assertListEqual([False, True, False], s.get(hf['v_set']).data[:].tolist())
+
+            with self.assertRaises(ValueError):
+                fields.DateTimeImporter(s, hf, 'y').write(['2020-05-10 12:00:00+01:00', ''])
+
     def test_date_importer(self):
         from datetime import datetime
         bio = BytesIO()
@@ -1170,3 +1267,18 @@ class TestSessionImporters(unittest.TestCase):
                 [datetime(year=int(v[0:4]), month=int(v[5:7]), day=int(v[8:10])
                           ).timestamp() for v in values],
                 f.data[:].tolist())
+
+            im = fields.DateImporter(s, hf, 'z')
+            chunk = im.chunk_factory(len(values))
+            chunk[:] = values
+            im.write(chunk)
+            self.assertListEqual(f.data[:].tolist(), s.get(hf['z']).data[:].tolist())
+
+            with self.assertRaises(ValueError):
+                fields.DateImporter(s, hf, 'w').write(['2020-01-01', '2020-01-01xx'])
+
+            fields.DateImporter(s, hf, 'v', optional=True).write(['2020-05-10', ''])
+            r = s.get(hf['v']).data[:].tolist()
+            self.assertEqual(datetime(2020, 5, 10).timestamp(), r[0])
+            self.assertTrue(np.isnan(r[1]))
+            self.assertListEqual([True, False], s.get(hf['v_set']).data[:].tolist())
@@ -14,6 +14,8 @@ import unittest
 import numpy as np
 
 from exetera.core.utils import find_longest_sequence_of, to_escaped, bytearray_to_escaped
+from exetera.core.utils import datetime_bytes_to_timestamps, date_bytes_to_timestamps, convert_all,\
+    convert_all_numbers, encode_strings, string_to_datetime
 
 
 class TestUtils(unittest.TestCase):
@@ -81,3 +83,92 @@ class TestUtils(unittest.TestCase):
         self.assertTrue(
             np.array_equal(dest[:len1 + len2],
                            np.frombuffer(b'"ab""cd""""ab"",""cd"""', dtype='S1')))
+
+    def test_datetime_bytes_to_timestamps(self):
+        from datetime import datetime
+        src = [b'2020-05-10 12:34:56', b'', b'2021-02-28 00:00:01+01:00',
+               b' 2000-02-29 23:59:59.123456+00:00', b'1969-12-31 23:59:59']
+        expected = [datetime(2020, 5, 10, 12, 34, 56).timestamp(), 0,
+                    datetime(2021, 2, 28, 0, 0, 1).timestamp(),
+                    datetime(2000, 2, 29, 23, 59, 59, 123456).timestamp(),
+                    datetime(1969, 12, 31, 23, 59, 59).timestamp()]
+        self.assertListEqual(datetime_bytes_to_timestamps(src).tolist(), expected)
+        self.assertEqual(len(datetime_bytes_to_timestamps([])), 0)
+
+        self.assertListEqual(datetime_bytes_to_timestamps([b'2020-05-10T12:34:56']).tolist(),
+                             [datetime(2020, 5, 10, 12, 34, 56).timestamp()])
+        self.assertListEqual(
+            datetime_bytes_to_timestamps([b'9999-12-31 23:59:59', b'2020-05-10 12:34:56']).tolist(),
+            [datetime(9999, 12, 31, 23, 59, 59).timestamp(),
+             datetime(2020, 5, 10, 12, 34, 56).timestamp()])
+
+        for bad in (b'2020-01-01', b'2021-02-29 00:00:00', b'2020-01-01 24:00:00',
+                    b'2020-0a-01 00:00:00', b'2020/01/01 00:00:00',
+                    b'2020-01-01 00:00:00+0100', b'2020-01-01 00:00:00.1234567+01:00'):
+            with self.assertRaises(ValueError):
+                datetime_bytes_to_timestamps([b'2020-01-01 00:00:00', bad])
+
+    def test_date_bytes_to_timestamps(self):
+        from datetime import datetime
+        src = [b'2020-05-10', b'', b' 2000-02-29', b'1969-12-31']
+        expected = [datetime(2020, 5, 10).timestamp(), 0, datetime(2000, 2, 29).timestamp(),
+                    datetime(1969, 12, 31).timestamp()]
+        self.assertListEqual(date_bytes_to_timestamps(src).tolist(), expected)
+        out = np.full(len(src), np.nan)
+        self.assertIs(date_bytes_to_timestamps(src, out=out), out)
+        self.assertListEqual(out.tolist(), expected)
+        self.assertListEqual(date_bytes_to_timestamps([b'2020-1-5']).tolist(),
+                             [datetime(2020, 1, 5).timestamp()])
+        self.assertListEqual(date_bytes_to_timestamps([b'9999-12-31', b'2020-05-10']).tolist(),
+                             [datetime(9999, 12, 31).timestamp(), datetime(2020, 5, 10).timestamp()])
+        self.assertListEqual(
+            date_bytes_to_timestamps([b'2020-1-5', b'2020-05-10', b'', b'2020-1-5']).tolist(),
+            [datetime(2020, 1, 5).timestamp(), datetime(2020, 5, 10).timestamp(), 0,
+             datetime(2020, 1, 5).timestamp()])
+
+        for bad in (b'2021-02-29', b'2020/01/01', b'2020-01-01 00:00:00'):
+            with self.assertRaises(ValueError):
+                date_bytes_to_timestamps([b'2020-01-01', bad])
+        for bad in ('2020-01-01xx', '2020/01/01'):
+            with self.assertRaises(ValueError):
+                date_bytes_to_timestamps(['2020-01-01', bad])
+
+    def test_string_to_datetime(self):
+        from datetime import datetime
+        for value, layout in (('2020-05-10 12:00:00+01:00', '%Y-%m-%d %H:%M:%S%z'),
+                              ('2020-05-12 07:30:00.250000-05:30', '%Y-%m-%d %H:%M:%S.%f%z'),
+                              ('2020-05-10 12:00:00+0100', '%Y-%m-%d %H:%M:%S%z'),
+                              ('2020-05-10', '%Y-%m-%d')):
+            self.assertEqual(datetime.strptime(value, layout), string_to_datetime(value))
+        for value in ('2020-02-30 12:00:00+01:00', '2020-05-10 12:00:00+00:90', ''):
+            with self.assertRaises(ValueError):
+                string_to_datetime(value)
+
+    def test_convert_all(self):
+        results, invalid_rows = convert_all(int, ['1', '', ' 2 ', 'x', '3', ''], -1)
+        self.assertListEqual(results, [1, -1, 2, -1, 3, -1])
+        self.assertListEqual(invalid_rows, [1, 3, 5])
+        self.assertEqual(convert_all(float, []), ([], []))
+
+    def test_encode_strings(self):
+        for values in (['ab', '', 'c'], ['ab', 'é', '', '€c'], []):
+            encoded, lengths = encode_strings(values)
+            self.assertEqual(''.join(values).encode(), encoded.tobytes())
+            self.assertListEqual([len(v.encode()) for v in values], lengths.tolist())
+
+    def test_convert_all_numbers(self):
+        values = ['1', '', ' 2 ', '-x', '+3', '1234567890123456789', '1_0']
+        results, invalid_rows = convert_all_numbers(int, values, -1)
+        self.assertListEqual(results.tolist(), [1, -1, 2, -1, 3, 1234567890123456789, 10])
+        self.assertListEqual(invalid_rows, [1, 3])
+        self.assertEqual(results.dtype, np.int64)
+
+        values = ['0.1', '-.5', '3.', '1e3', 'nan', '', '.', '-0']
+        results, invalid_rows = convert_all_numbers(float, values, -1)
+        self.assertListEqual(results[:4].tolist(), [0.1, -0.5, 3.0, 1000.0])
+        self.assertTrue(np.isnan(results[4]))
+        self.assertListEqual(results[5:7].tolist(), [-1, -1])
+        self.assertTrue(np.signbit(results[7]))
+        self.assertListEqual(invalid_rows, [5, 6])
+
+        self.assertEqual(convert_all(int, ['é', '1']), convert_all_numbers(int, ['é', '1']))